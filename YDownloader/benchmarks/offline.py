@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import functools
+import http.server
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+from src import session
+from src.downloader import YouTubeDownloader
+
+# Encoder candidates per codec, first available wins: (ffmpeg encoder, extra args)
+VIDEO_ENCODERS = {
+    'h264': [('libx264', ['-preset', 'veryfast', '-pix_fmt', 'yuv420p'])],
+    'vp9': [('libvpx-vp9', ['-deadline', 'realtime', '-cpu-used', '8', '-b:v', '1M'])],
+    'av1': [('libsvtav1', ['-preset', '12']),
+            ('libaom-av1', ['-usage', 'realtime', '-cpu-used', '8', '-row-mt', '1', '-b:v', '1M'])],
+}
+AUDIO_ENCODERS = {
+    'aac': [('aac', ['-b:a', '128k'])],
+    'opus': [('libopus', ['-b:a', '96k'])],
+}
+# Container and the codec string YouTube reports for each synthetic stream
+VIDEO_FORMATS = {'h264': ('mp4', 'avc1.64001f'), 'vp9': ('webm', 'vp09.00.30.08'), 'av1': ('webm', 'av01.0.05M.08')}
+AUDIO_FORMATS = {'aac': ('m4a', 'mp4a.40.2'), 'opus': ('webm', 'opus')}
+COMBOS = [('h264', 'aac'), ('vp9', 'opus'), ('av1', 'opus')]
+
+BENCH_URL = 'https://bench.invalid/watch?v={}'
+
+
+class MediaHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    bytes_sent = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            self.wfile.write(f.read(end - start + 1))
+        with MediaHandler.lock:
+            MediaHandler.bytes_sent += end - start + 1
+
+    def log_message(self, *args):
+        pass
+
+
+class BenchIE(InfoExtractor):
+    # Video ids look like "<vcodec>-<acodec>-<n>" and select which synthetic streams are offered
+    _VALID_URL = r'https?://bench\.invalid/watch\?v=(?P<id>(?P<vcodec>\w+)-(?P<acodec>\w+)-\w+)'
+    IE_NAME = 'bench'
+    base_url = ''
+    media_dir = Path('.')
+    duration = 0
+
+    def _real_extract(self, url):
+        video_id, vcodec, acodec = self._match_valid_url(url).group('id', 'vcodec', 'acodec')
+        video_ext, video_codec = VIDEO_FORMATS[vcodec]
+        audio_ext, audio_codec = AUDIO_FORMATS[acodec]
+        video_file, audio_file = f'video-{vcodec}.{video_ext}', f'audio-{acodec}.{audio_ext}'
+        return {
+            'id': video_id,
+            'title': f'Bench {video_id}',
+            'duration': self.duration,
+            'formats': [
+                {'format_id': 'v', 'url': f'{self.base_url}/{video_file}', 'ext': video_ext, 'vcodec': video_codec,
+                 'acodec': 'none', 'height': 360, 'width': 640,
+                 'filesize': (self.media_dir / video_file).stat().st_size},
+                {'format_id': 'a', 'url': f'{self.base_url}/{audio_file}', 'ext': audio_ext, 'vcodec': 'none',
+                 'acodec': audio_codec, 'filesize': (self.media_dir / audio_file).stat().st_size},
+            ],
+        }
+
+
+_managed_ydl_class = session.managed_ydl_class
+
+
+@functools.lru_cache(maxsize=None)
+def bench_ydl_class():
+    base = _managed_ydl_class()
+
+    class BenchYoutubeDL(base):
+        def add_default_info_extractors(self):
+            # Registered ahead of the built-in extractors so the generic one does not claim the URL
+            self.add_info_extractor(BenchIE())
+            super().add_default_info_extractors()
+
+    return BenchYoutubeDL
+
+
+def pick_encoder(available: str, candidates: list):
+    for name, args in candidates:
+        if re.search(rf'\s{re.escape(name)}\s', available):
+            return name, args
+    return None
+
+
+def generate_clips(ffmpeg: str, media_dir: Path, duration: float, size: str) -> dict:
+    available = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, text=True).stdout
+    generated = {'video': {}, 'audio': {}, 'muxed': {}}
+
+    for codec, candidates in VIDEO_ENCODERS.items():
+        encoder = pick_encoder(available, candidates)
+        if not encoder:
+            continue
+        output = media_dir / f'video-{codec}.{VIDEO_FORMATS[codec][0]}'
+        subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', f'testsrc=duration={duration}:size={size}:rate=30',
+                        '-c:v', encoder[0], *encoder[1], '-an', '-y', str(output)], check=True)
+        generated['video'][codec] = output
+
+    for codec, candidates in AUDIO_ENCODERS.items():
+        encoder = pick_encoder(available, candidates)
+        if not encoder:
+            continue
+        output = media_dir / f'audio-{codec}.{AUDIO_FORMATS[codec][0]}'
+        subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+                        '-c:a', encoder[0], *encoder[1], '-vn', '-y', str(output)], check=True)
+        generated['audio'][codec] = output
+
+    for vcodec, acodec in COMBOS:
+        if vcodec in generated['video'] and acodec in generated['audio']:
+            output = media_dir / f'muxed-{vcodec}-{acodec}.{VIDEO_FORMATS[vcodec][0]}'
+            subprocess.run([ffmpeg, '-v', 'error', '-i', str(generated['video'][vcodec]),
+                            '-i', str(generated['audio'][acodec]), '-c', 'copy', '-y', str(output)], check=True)
+            generated['muxed'][f'{vcodec}+{acodec}'] = output
+    return generated
+
+
+@contextlib.contextmanager
+def quiet(sink):
+    # Warm yt-dlp sessions keep the streams they were created with, so the sink must outlive every run
+    if sink is None:
+        yield
+        return
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        yield
+
+
+def new_downloader(output_dir: Path, jobs: int = 1) -> YouTubeDownloader:
+    # A raw spec lets every codec through; the named presets would skip the VP9/AV1/Opus streams
+    return YouTubeDownloader(output_dir=str(output_dir), quality='bestvideo+bestaudio', jobs=jobs,
+                             use_cache=False, use_archive=False)
+
+
+def summarize(timings: list, nbytes: int = 0) -> dict:
+    total = sum(timings)
+    summary = {
+        'runs': len(timings),
+        'total_s': round(total, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'min_ms': round(min(timings) * 1000, 1),
+        'max_ms': round(max(timings) * 1000, 1),
+    }
+    if nbytes:
+        summary['bytes'] = nbytes
+        summary['throughput_mb_s'] = round(nbytes / total / 1e6, 2) if total else None
+    return summary
+
+
+def bench_download_video(work_dir: Path, combo: tuple, videos: int, sink) -> dict:
+    downloader = new_downloader(work_dir / f'download-{"-".join(combo)}')
+    timings, successes = [], 0
+    MediaHandler.bytes_sent = 0
+    try:
+        for index in range(videos):
+            start = time.perf_counter()
+            with quiet(sink):
+                successes += downloader.download_video(BENCH_URL.format(f'{combo[0]}-{combo[1]}-{index}'))
+            timings.append(time.perf_counter() - start)
+    finally:
+        downloader.close()
+
+    result = summarize(timings, MediaHandler.bytes_sent)
+    # The first video also pays for building the session and loading extractors
+    result['first_video_ms'] = round(timings[0] * 1000, 1)
+    result['successful'] = successes
+    return result
+
+
+def bench_download_from_list(work_dir: Path, combo: tuple, videos: int, jobs: int, sink) -> dict:
+    list_file = work_dir / 'bench_list.txt'
+    list_file.write_text('\n'.join(BENCH_URL.format(f'{combo[0]}-{combo[1]}-list{index}')
+                                   for index in range(videos)) + '\n', encoding='utf-8')
+    downloader = new_downloader(work_dir / 'download-list', jobs)
+    MediaHandler.bytes_sent = 0
+    try:
+        start = time.perf_counter()
+        with quiet(sink):
+            stats = downloader.download_from_list(str(list_file))
+        elapsed = time.perf_counter() - start
+    finally:
+        downloader.close()
+
+    return {
+        'videos': videos,
+        'jobs': jobs,
+        'wall_s': round(elapsed, 3),
+        'per_video_ms': round(elapsed / videos * 1000, 1),
+        'successful': stats['successful'],
+        'bytes': MediaHandler.bytes_sent,
+        'throughput_mb_s': round(MediaHandler.bytes_sent / elapsed / 1e6, 2) if elapsed else None,
+        'stage_timings_s': {stage: round(value, 3) for stage, value in stats.get('timings', {}).items()
+                            if isinstance(value, float)},
+    }
+
+
+def bench_operation(work_dir: Path, runs: int, sink, sources: list, operation) -> dict:
+    # Merge and conversion delete their inputs, so each run works on fresh copies
+    downloader = new_downloader(work_dir / 'ops')
+    timings, successes = [], 0
+    try:
+        for run in range(runs):
+            copies = []
+            for source in sources:
+                copy = work_dir / 'ops' / f'run{run}-{source.name}'
+                shutil.copyfile(source, copy)
+                copies.append(str(copy))
+            start = time.perf_counter()
+            with quiet(sink):
+                successes += bool(operation(downloader, copies, str(work_dir / 'ops' / f'run{run}-out.mp4')))
+            timings.append(time.perf_counter() - start)
+    finally:
+        downloader.close()
+    return {**summarize(timings), 'successful': successes}
+
+
+def bench_codec_check(work_dir: Path, runs: int, source: Path) -> dict:
+    downloader = new_downloader(work_dir / 'ops')
+    cold, warm = [], []
+    try:
+        for _ in range(runs):
+            downloader.converter.probes.invalidate()
+            start = time.perf_counter()
+            compatible = downloader._check_codec_compatibility(str(source))
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            downloader._check_codec_compatibility(str(source))
+            warm.append(time.perf_counter() - start)
+    finally:
+        downloader.close()
+    return {'compatible': compatible, 'cold': summarize(cold), 'memoized': summarize(warm)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark downloads, merges and conversions offline against '
+                                                 'synthetic clips served from a local HTTP server')
+    parser.add_argument('-n', '--videos', type=int, default=5, help='Videos per download scenario (default: 5)')
+    parser.add_argument('-r', '--runs', type=int, default=3, help='Runs per merge/convert/probe measurement (default: 3)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Parallel jobs for the list scenario (default: 4)')
+    parser.add_argument('--duration', type=float, default=5, help='Synthetic clip length in seconds (default: 5)')
+    parser.add_argument('--size', type=str, default='640x360', help='Synthetic clip resolution (default: 640x360)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show downloader output while measuring')
+    parser.add_argument('-o', '--output', type=str, help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        parser.error('ffmpeg is required to generate the synthetic clips')
+
+    with tempfile.TemporaryDirectory(prefix='ydl-offline-') as tmp, open(os.devnull, 'w', encoding='utf-8') as devnull:
+        work_dir = Path(tmp)
+        sink = None if args.verbose else devnull
+        media_dir = work_dir / 'media'
+        media_dir.mkdir()
+        (work_dir / 'ops').mkdir()
+        clips = generate_clips(ffmpeg, media_dir, args.duration, args.size)
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                 functools.partial(MediaHandler, directory=str(media_dir)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        BenchIE.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        BenchIE.media_dir = media_dir
+        BenchIE.duration = args.duration
+        session.managed_ydl_class = bench_ydl_class
+
+        combos = [combo for combo in COMBOS if f'{combo[0]}+{combo[1]}' in clips['muxed']]
+        results = {
+            'python': sys.version.split()[0],
+            'yt_dlp': yt_dlp.version.__version__,
+            'ffmpeg': subprocess.run([ffmpeg, '-version'], capture_output=True, text=True).stdout.split('\n')[0],
+            # Without ffprobe every probe comes back empty, so the codec checks measure nothing
+            'ffprobe': bool(shutil.which('ffprobe')),
+            'clip': {'duration_s': args.duration, 'size': args.size},
+            'codecs': sorted(clips['muxed']),
+            'download_video': {},
+            'merge_video_audio': {},
+            'convert_to_compatible_mp4': {},
+            'check_codec_compatibility': {},
+        }
+        try:
+            for vcodec, acodec in combos:
+                name = f'{vcodec}+{acodec}'
+                video, audio = clips['video'][vcodec], clips['audio'][acodec]
+                results['download_video'][name] = bench_download_video(work_dir, (vcodec, acodec), args.videos,
+                                                                       sink)
+                results['merge_video_audio'][name] = bench_operation(
+                    work_dir, args.runs, sink, [video, audio],
+                    lambda downloader, files, output: downloader._merge_video_audio(files[0], files[1], output))
+                results['convert_to_compatible_mp4'][name] = bench_operation(
+                    work_dir, args.runs, sink, [clips['muxed'][name]],
+                    lambda downloader, files, output: downloader._convert_to_compatible_mp4(files[0], output))
+                results['check_codec_compatibility'][name] = bench_codec_check(work_dir, args.runs,
+                                                                               clips['muxed'][name])
+            if combos:
+                results['download_from_list'] = bench_download_from_list(work_dir, combos[0], args.videos,
+                                                                         args.jobs, sink)
+        finally:
+            server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import http.server
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from src.session import SessionPool
+
+REQUESTS_PER_VIDEO = 3
+OPTS = {'quiet': True, 'no_warnings': True}
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with KeepAliveHandler.lock:
+            KeepAliveHandler.connections += 1
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_video(ydl, base_url: str, index: int):
+    # Stand-in for the page, player and API requests a real extraction makes
+    for step in range(REQUESTS_PER_VIDEO):
+        ydl.urlopen(f'{base_url}/video/{index}/{step}').read()
+
+
+def run_fresh(base_url: str, videos: int) -> float:
+    start = time.perf_counter()
+    for index in range(videos):
+        with yt_dlp.YoutubeDL(dict(OPTS)) as ydl:
+            fetch_video(ydl, base_url, index)
+    return time.perf_counter() - start
+
+
+def run_pooled(base_url: str, videos: int) -> float:
+    pool = SessionPool()
+    start = time.perf_counter()
+    try:
+        for index in range(videos):
+            with pool.session('info', lambda: dict(OPTS)) as session:
+                fetch_video(session.ydl, base_url, index)
+    finally:
+        elapsed = time.perf_counter() - start
+        pool.close()
+    return elapsed
+
+
+def measure(name: str, runner, base_url: str, videos: int) -> dict:
+    KeepAliveHandler.connections = 0
+    elapsed = runner(base_url, videos)
+    return {
+        'mode': name,
+        'videos': videos,
+        'total_s': round(elapsed, 3),
+        'per_video_ms': round(elapsed / videos * 1000, 2),
+        'tcp_connections': KeepAliveHandler.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-video YoutubeDL overhead: fresh instance vs session pool')
+    parser.add_argument('-n', '--videos', type=int, default=50, help='Simulated videos per mode (default: 50)')
+    parser.add_argument('-o', '--output', type=str, help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    try:
+        results = {
+            'requests_per_video': REQUESTS_PER_VIDEO,
+            'yt_dlp': yt_dlp.version.__version__,
+            'results': [
+                measure('fresh-instance', run_fresh, base_url, args.videos),
+                measure('session-pool', run_pooled, base_url, args.videos),
+            ],
+        }
+    finally:
+        server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
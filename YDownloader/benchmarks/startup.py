@@ -0,0 +1,76 @@
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MAIN = str(ROOT / 'main.py')
+
+
+def build_modes(work_dir: Path) -> dict:
+    modes = {
+        'version': [MAIN, '--version'],
+        'help': [MAIN, '--help'],
+        'convert-missing-file': [MAIN, '--convert', str(work_dir / 'missing.mp4')],
+        'info-invalid-url': [MAIN, '-u', 'not-a-youtube-url', '--info', '-o', str(work_dir / 'out')],
+        'import-yt-dlp': ['-c', 'import yt_dlp'],
+    }
+
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        sample = work_dir / 'sample.mp4'
+        subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=duration=1:size=160x120:rate=10',
+                        '-c:v', 'libx264', '-y', str(sample)], check=True)
+        modes['convert'] = [MAIN, '--convert', str(sample)]
+    return modes
+
+
+def measure(args: list, runs: int, work_dir: Path) -> dict:
+    timings = []
+    imported_yt_dlp = False
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=str(work_dir),
+                                capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        timings.append(time.perf_counter() - start)
+        imported_yt_dlp = imported_yt_dlp or ' yt_dlp\n' in result.stderr
+        # --convert consumes its input, so recreate it for the next run
+        if '--convert' in args and (work_dir / 'sample_compatible.mp4').exists():
+            (work_dir / 'sample_compatible.mp4').replace(work_dir / 'sample.mp4')
+
+    return {
+        'runs': runs,
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'min_ms': round(min(timings) * 1000, 1),
+        'max_ms': round(max(timings) * 1000, 1),
+        'imports_yt_dlp': imported_yt_dlp,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure YDownloader cold-start time per CLI mode')
+    parser.add_argument('-n', '--runs', type=int, default=5, help='Runs per mode (default: 5)')
+    parser.add_argument('-o', '--output', type=str, help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ydl-startup-') as tmp:
+        work_dir = Path(tmp)
+        results = {
+            'python': sys.version.split()[0],
+            'modes': {name: measure(cmd, args.runs, work_dir) for name, cmd in build_modes(work_dir).items()},
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
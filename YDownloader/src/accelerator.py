@@ -0,0 +1,245 @@
+import functools
+import os
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .defaults import DEFAULT_CHUNK_SIZE
+
+DEFAULT_CONNECTIONS = 4
+MIN_ACCELERATED_SIZE = 1024 * 1024
+
+Opener = Callable[[str, Dict[str, str]], object]
+
+
+class RangeDownloader:
+
+    BLOCK_SIZE = 64 * 1024
+    RETRIES = 3
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, connections: int = DEFAULT_CONNECTIONS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 opener: Optional[Opener] = None, timeout: float = 30):
+        self.connections = max(1, connections)
+        self.chunk_size = max(self.BLOCK_SIZE, chunk_size)
+        self.opener = opener
+        self.timeout = timeout
+
+    def _open(self, url: str, headers: Dict[str, str], opener: Optional[Opener] = None):
+        opener = opener or self.opener
+        if opener:
+            return opener(url, headers)
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+
+    def probe(self, url: str, headers: Optional[Dict[str, str]] = None, opener: Optional[Opener] = None) -> Optional[int]:
+        # A one-byte range tells us both the exact size and whether the server honours ranges
+        response = self._open(url, {**(headers or {}), 'Range': 'bytes=0-0'}, opener)
+        with closing(response):
+            if response.status != 206:
+                return None
+            match = re.match(r'bytes\s+\d+-\d+/(\d+)', response.headers.get('Content-Range') or '')
+            return int(match.group(1)) if match else None
+
+    def ranges(self, size: int) -> List[Tuple[int, int]]:
+        # Never fewer chunks than connections, so small files still use every connection
+        chunk = max(self.BLOCK_SIZE, min(self.chunk_size, -(-size // self.connections)))
+        return [(start, min(start + chunk, size) - 1) for start in range(0, size, chunk)]
+
+    def _load_journal(self, journal: str, size: int) -> List[Tuple[int, int]]:
+        try:
+            with open(journal, 'r', encoding='utf-8') as f:
+                lines = f.read().split('\n')
+        except OSError:
+            return []
+        if not lines or lines[0] != str(size):
+            return []
+        completed = []
+        for line in lines[1:]:
+            parts = line.split()
+            # A torn last line from a crash just means that range is fetched again
+            if len(parts) == 2 and all(part.isdigit() for part in parts):
+                completed.append((int(parts[0]), int(parts[1])))
+        return completed
+
+    @staticmethod
+    def _covered(start: int, end: int, completed: List[Tuple[int, int]]) -> bool:
+        position = start
+        for done_start, done_end in sorted(completed):
+            if done_start > position:
+                break
+            position = max(position, done_end + 1)
+            if position > end:
+                return True
+        return False
+
+    def discard(self, path: str):
+        # A .part left by a ranged download is preallocated to full size with holes in it;
+        # anything that resumes it byte by byte would take it for complete
+        journal = path + '.ranges'
+        if not os.path.exists(journal):
+            return
+        for leftover in (path, journal):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+
+    def download(self, url: str, path: str, size: int, headers: Optional[Dict[str, str]] = None,
+                 on_progress: Optional[Callable[[int], None]] = None, opener: Optional[Opener] = None,
+                 resume: bool = True) -> int:
+        # The journal next to the .part file lists finished ranges, so an interrupted download resumes
+        journal = path + '.ranges'
+        completed = []
+        if resume and os.path.exists(path) and os.path.getsize(path) == size:
+            completed = self._load_journal(journal, size)
+        if not completed:
+            # Preallocate so every range is written straight to its final offset, no reassembly pass
+            with open(path, 'wb') as f:
+                f.truncate(size)
+            with open(journal, 'w', encoding='utf-8') as f:
+                f.write(f"{size}\n")
+
+        ranges = [(start, end) for start, end in self.ranges(size) if not self._covered(start, end, completed)]
+        stop = threading.Event()
+        lock = threading.Lock()
+        state = {'done': size - sum(end - start + 1 for start, end in ranges), 'reported': 0.0}
+
+        def advance(count: int):
+            with lock:
+                state['done'] += count
+                now = time.monotonic()
+                if on_progress and (now - state['reported'] >= self.PROGRESS_INTERVAL or state['done'] == size):
+                    state['reported'] = now
+                    on_progress(state['done'])
+
+        def finished(start: int, end: int):
+            with lock, open(journal, 'a', encoding='utf-8') as f:
+                f.write(f"{start} {end}\n")
+
+        if ranges:
+            pool = ThreadPoolExecutor(max_workers=min(self.connections, len(ranges)), thread_name_prefix='ydl-range')
+            try:
+                futures = [pool.submit(self._fetch_range, url, path, start, end, headers or {}, advance, finished,
+                                       stop, opener)
+                           for start, end in ranges]
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+            finally:
+                stop.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        os.remove(journal)
+        return state['done']
+
+    def _fetch_range(self, url: str, path: str, start: int, end: int, headers: Dict[str, str],
+                     advance: Callable[[int], None], finished: Callable[[int, int], None],
+                     stop: threading.Event, opener: Optional[Opener]):
+        offset = start
+        error = None
+        for _ in range(self.RETRIES):
+            if stop.is_set():
+                return
+            try:
+                # Retries pick up from the last byte written rather than refetching the whole range
+                response = self._open(url, {**headers, 'Range': f'bytes={offset}-{end}'}, opener)
+                with closing(response), open(path, 'r+b') as f:
+                    if response.status != 206:
+                        raise IOError(f"Server ignored byte range request (HTTP {response.status})")
+                    f.seek(offset)
+                    while offset <= end and not stop.is_set():
+                        block = response.read(min(self.BLOCK_SIZE, end - offset + 1))
+                        if not block:
+                            break
+                        f.write(block)
+                        offset += len(block)
+                        advance(len(block))
+                if offset > end:
+                    finished(start, end)
+                    return
+                if stop.is_set():
+                    return
+                error = IOError(f"Connection closed at byte {offset} of range {start}-{end}")
+            except Exception as e:
+                error = e
+        raise IOError(f"Range {start}-{end} failed: {error}")
+
+
+def accepts_ranges(info: Dict) -> bool:
+    return (info.get('protocol') in ('http', 'https')
+            and bool(info.get('url'))
+            and not info.get('requested_formats')
+            and not info.get('is_live')
+            and info.get('http_headers') is not None)
+
+
+def is_fragmented(info: Dict) -> bool:
+    return str(info.get('protocol') or '').startswith(('http_dash_segments', 'm3u8'))
+
+
+@functools.lru_cache(maxsize=None)
+def range_fd_class():
+    from yt_dlp.downloader.http import HttpFD
+
+    class RangeFD(HttpFD):
+        FD_NAME = 'ranges'
+
+        def real_download(self, filename, info_dict):
+            accelerator: RangeDownloader = self.ydl.range_downloader
+            url, headers = info_dict['url'], info_dict['http_headers']
+            opener = self._opener()
+            try:
+                size = accelerator.probe(url, headers, opener)
+            except Exception:
+                size = None
+            if not size or size < MIN_ACCELERATED_SIZE:
+                # No range support or too small to be worth splitting: plain single-connection fetch
+                accelerator.discard(self.temp_name(filename))
+                return super().real_download(filename, info_dict)
+
+            tmpfilename = self.temp_name(filename)
+            started = time.time()
+
+            def report(done: int):
+                now = time.time()
+                self._hook_progress({
+                    'status': 'downloading',
+                    'downloaded_bytes': done,
+                    'total_bytes': size,
+                    'filename': filename,
+                    'tmpfilename': tmpfilename,
+                    'elapsed': now - started,
+                    'speed': self.calc_speed(started, now, done),
+                    'eta': self.calc_eta(started, now, size, done),
+                }, info_dict)
+
+            self.to_screen(f"[download] Fetching {size} bytes over {accelerator.connections} connections")
+            try:
+                accelerator.download(url, tmpfilename, size, headers, report, opener,
+                                     resume=self.params.get('continuedl', True))
+            except Exception as e:
+                self.report_error(f"Accelerated download failed: {e}")
+                return False
+
+            self.try_rename(tmpfilename, filename)
+            self._hook_progress({
+                'status': 'finished',
+                'downloaded_bytes': size,
+                'total_bytes': size,
+                'filename': filename,
+                'elapsed': time.time() - started,
+            }, info_dict)
+            return True
+
+        def _opener(self) -> Opener:
+            from yt_dlp.networking import Request
+
+            # Go through yt-dlp's networking stack so proxies, cookies and impersonation still apply
+            return lambda url, headers: self.ydl.urlopen(Request(url, headers=headers))
+
+    return RangeFD
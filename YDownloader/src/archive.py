@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class DownloadArchive:
+
+    def __init__(self, db_path: Path, enabled: bool = True):
+        self.db_path = Path(db_path)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+        self._index: Dict[Tuple[str, str], Dict] = {}
+
+        if self.enabled:
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            # WAL lets several list runs read the index while one of them records a completion
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS downloads ('
+                    'video_id TEXT NOT NULL, '
+                    'quality TEXT NOT NULL, '
+                    'path TEXT NOT NULL, '
+                    'size INTEGER NOT NULL, '
+                    'completed_at REAL NOT NULL, '
+                    'PRIMARY KEY (video_id, quality))'
+                )
+            for video_id, quality, path, size in self._conn.execute('SELECT video_id, quality, path, size FROM downloads'):
+                self._index[(video_id, quality)] = {'path': path, 'size': size}
+
+    def lookup(self, video_id: Optional[str], quality: str) -> Optional[Dict]:
+        if not self.enabled or not video_id:
+            return None
+
+        key = (video_id, quality)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                # Another process sharing the archive may have finished it since we loaded the index
+                row = self._conn.execute(
+                    'SELECT path, size FROM downloads WHERE video_id = ? AND quality = ?', key
+                ).fetchone()
+                if row is None:
+                    return None
+                entry = self._index[key] = {'path': row[0], 'size': row[1]}
+
+        try:
+            if os.path.getsize(entry['path']) == entry['size']:
+                return entry
+        except OSError:
+            pass
+
+        self.forget(video_id, quality)
+        return None
+
+    def record(self, video_id: Optional[str], quality: str, path: str):
+        if not self.enabled or not video_id or not path:
+            return
+
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+
+        path = str(Path(path).absolute())
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO downloads (video_id, quality, path, size, completed_at) VALUES (?, ?, ?, ?, ?)',
+                (video_id, quality, path, size, time.time())
+            )
+            self._index[(video_id, quality)] = {'path': path, 'size': size}
+
+    def forget(self, video_id: str, quality: str):
+        if not self.enabled:
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM downloads WHERE video_id = ? AND quality = ?', (video_id, quality))
+            self._index.pop((video_id, quality), None)
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+            self.enabled = False
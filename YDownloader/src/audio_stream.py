@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .media import STREAM_AUDIO_FORMATS
+from .progress import ProgressCallback, run_ffmpeg
+
+READ_SIZE = 256 * 1024
+MUXERS = {'mp3': 'mp3', 'm4a': 'ipod'}
+
+
+class StreamCancelled(Exception):
+    pass
+
+
+def audio_output_args(output_format: str, source_acodec: Optional[str]) -> List[str]:
+    if output_format == 'm4a':
+        # AAC sources only need rewrapping; anything else is encoded to AAC
+        if (source_acodec or '').startswith('mp4a'):
+            return ['-c:a', 'copy', '-movflags', '+faststart']
+        return ['-c:a', 'aac', '-b:a', '192k', '-movflags', '+faststart']
+    return ['-c:a', 'libmp3lame', '-q:a', '0']
+
+
+def iter_response(response, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = response.read(read_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        response.close()
+
+
+def iter_ranges(open_range: Callable[[int, int], object], chunk_size: int, size: Optional[int] = None,
+                read_size: int = READ_SIZE) -> Iterator[bytes]:
+    # Same as yt-dlp's HttpFD with http_chunk_size: YouTube throttles or drops long unranged media requests
+    start = 0
+    while size is None or start < size:
+        end = start + chunk_size - 1 if size is None else min(start + chunk_size, size) - 1
+        response = open_range(start, end)
+        if response.status != 206:
+            if start:
+                response.close()
+                raise IOError(f"Server ignored the range request at byte {start}")
+            # Ranges not supported: the whole file is coming in this one response
+            yield from iter_response(response, read_size)
+            return
+        match = re.match(r'bytes\s+\d+-\d+/(\d+)', response.headers.get('Content-Range') or '')
+        if match:
+            size = int(match.group(1))
+
+        received = 0
+        for chunk in iter_response(response, read_size):
+            received += len(chunk)
+            yield chunk
+        if not received:
+            raise IOError(f"Empty response for bytes {start}-{end}")
+        if size is None and received < end - start + 1:
+            # A short range with no known total is the end of the file
+            return
+        # A range cut short is picked up where it stopped
+        start += received
+
+
+def until_cancelled(chunks: Iterable[bytes], cancelled: threading.Event) -> Iterator[bytes]:
+    # Breaking the input makes run_ffmpeg kill ffmpeg, so nothing half-written is kept
+    for chunk in chunks:
+        if cancelled.is_set():
+            raise StreamCancelled("Streaming cancelled")
+        yield chunk
+
+
+def stream_audio(ffmpeg_cmd: str, chunks: Iterable[bytes], output_file: str, output_format: str = 'mp3',
+                 source_acodec: Optional[str] = None, duration: Optional[float] = None,
+                 on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str]:
+    if output_format not in STREAM_AUDIO_FORMATS:
+        raise ValueError(f"Unknown streaming audio format: {output_format}")
+
+    # ffmpeg reads the HTTP body from stdin and writes the final file; no intermediate download on disk
+    part_file = output_file + '.part'
+    cmd = [
+        ffmpeg_cmd,
+        '-hide_banner',
+        '-i', 'pipe:0',
+        '-vn',
+        *audio_output_args(output_format, source_acodec),
+        '-f', MUXERS[output_format],
+        '-y', part_file
+    ]
+
+    task = Path(output_file).name
+    if on_progress:
+        on_progress({'task': task, 'status': 'start', 'duration': duration})
+    report = (lambda snapshot: on_progress({'task': task, 'status': 'progress', **snapshot})) if on_progress else None
+
+    timeout = max(1800, (duration or 0) * 10)
+    success = False
+    try:
+        # Raises whatever broke the input stream; the partial output is dropped below
+        success, error = run_ffmpeg(cmd, duration, report, timeout, stdin_chunks=chunks)
+    finally:
+        if success:
+            os.replace(part_file, output_file)
+        elif os.path.exists(part_file):
+            os.remove(part_file)
+        if on_progress:
+            on_progress({'task': task, 'status': 'end', 'success': success})
+    return success, error
@@ -0,0 +1,106 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .defaults import DEFAULT_CACHE_TTL
+
+
+class MetadataCache:
+
+    DEFAULT_TTL = DEFAULT_CACHE_TTL
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, db_path: Path, ttl: int = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS metadata ('
+                    'video_id TEXT PRIMARY KEY, '
+                    'info TEXT NOT NULL, '
+                    'size INTEGER NOT NULL, '
+                    'fetched_at REAL NOT NULL, '
+                    'accessed_at REAL NOT NULL)'
+                )
+                self._conn.execute('CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)')
+
+    def get(self, video_id: Optional[str]) -> Optional[Dict]:
+        if not self.enabled or not video_id:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT info, fetched_at FROM metadata WHERE video_id = ?', (video_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            info, fetched_at = row
+            with self._conn:
+                if now - fetched_at > self.ttl:
+                    self._conn.execute('DELETE FROM metadata WHERE video_id = ?', (video_id,))
+                    return None
+                self._conn.execute('UPDATE metadata SET accessed_at = ? WHERE video_id = ?', (now, video_id))
+
+        try:
+            return json.loads(info)
+        except ValueError:
+            self.invalidate(video_id)
+            return None
+
+    def put(self, video_id: Optional[str], info: Dict):
+        if not self.enabled or not video_id:
+            return
+
+        payload = json.dumps(info, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metadata (video_id, info, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (video_id, payload, len(payload), now, now)
+            )
+            self._evict()
+
+    def invalidate(self, video_id: Optional[str] = None):
+        if not self.enabled:
+            return
+
+        with self._lock, self._conn:
+            if video_id:
+                self._conn.execute('DELETE FROM metadata WHERE video_id = ?', (video_id,))
+            else:
+                self._conn.execute('DELETE FROM metadata')
+
+    def _evict(self):
+        self._conn.execute('DELETE FROM metadata WHERE fetched_at < ?', (time.time() - self.ttl,))
+
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM metadata').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        stale = []
+        for video_id, size in self._conn.execute('SELECT video_id, size FROM metadata ORDER BY accessed_at'):
+            stale.append((video_id,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany('DELETE FROM metadata WHERE video_id = ?', stale)
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+            self.enabled = False
@@ -1,10 +1,20 @@
 import argparse
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 from colorama import init, Fore, Style
 
-from .downloader import YouTubeDownloader
-from .utils import validate_url, print_banner, print_stats
+from .defaults import DEFAULT_CACHE_TTL, DEFAULT_CHUNK_SIZE, DEFAULT_DAEMON_ADDRESS
+from .media import STREAM_AUDIO_FORMATS, TRANSCODE_PROFILES
+from .info_export import INFO_FORMATS, write_info_records
+from .metrics import Metrics
+from .quality import QUALITY_RULES, load_quality_rules
+from .ratelimit import RateLimiter
+from .utils import (validate_url, is_collection_url, extract_video_id, parse_size, print_banner, print_stats,
+                    read_url_list)
+
+if TYPE_CHECKING:
+    from .downloader import YouTubeDownloader
 
 init(autoreset=True)
 
@@ -18,9 +28,16 @@ Examples:
   %(prog)s -u "https://youtube.com/watch?v=dQw4w9WgXcQ" -q ultra
   %(prog)s -u "https://youtube.com/watch?v=dQw4w9WgXcQ" -q 4k  
   %(prog)s -l video_list.txt -q best
+  %(prog)s -l video_list.txt -j 4 --max-transcodes 2
+  %(prog)s -u "https://youtube.com/watch?v=dQw4w9WgXcQ" --connections 8 --chunk-size 4M
+  %(prog)s -l video_list.txt --info -j 8 --info-format csv --info-output audit.csv
   %(prog)s -u "https://youtube.com/watch?v=dQw4w9WgXcQ" --list-formats
   %(prog)s -u "https://youtube.com/watch?v=dQw4w9WgXcQ" -q 1080p -o ./my_videos/
+  %(prog)s -l podcasts.txt -q audio --stream-audio --audio-format m4a
   %(prog)s --convert video.mp4
+  %(prog)s --serve -q 1080p -j 4 -o ./videos/
+  %(prog)s -l video_list.txt --submit --wait
+  %(prog)s --list-jobs
   
 Quality options:
   ultra - Maximum available quality (4K/1440p/1080p with best audio)
@@ -29,6 +46,7 @@ Quality options:
   best  - Best quality with video+audio merge
   1080p - 1080p quality
   720p  - 720p quality
+  480p, 360p, worst, audio, or your own profiles via --quality-file
         '''
     )
     
@@ -48,8 +66,27 @@ Quality options:
         '-q', '--quality',
         type=str,
         default='best',
-        choices=['best', 'ultra', '4k', '1440p', '1080p', '720p', '480p', '360p', 'worst', 'audio'],
-        help='Video quality to download (default: best)'
+        help=f"Video quality to download: {', '.join(QUALITY_RULES)} or a profile from --quality-file (default: best)"
+    )
+    
+    parser.add_argument(
+        '--quality-file',
+        type=str,
+        help='JSON file with extra quality profiles, e.g. {"hd-h264": {"max_height": 1080, "vcodecs": ["avc1"], "max_tbr": 8000}}'
+    )
+    
+    parser.add_argument(
+        '--stream-audio',
+        action='store_true',
+        help='With -q audio, pipe the download straight into ffmpeg instead of saving the source file first'
+    )
+    
+    parser.add_argument(
+        '--audio-format',
+        type=str,
+        default='mp3',
+        choices=STREAM_AUDIO_FORMATS,
+        help='Output format for -q audio (default: mp3)'
     )
     
     parser.add_argument(
@@ -65,6 +102,21 @@ Quality options:
         help='Show video information without downloading'
     )
     
+    parser.add_argument(
+        '--info-format',
+        type=str,
+        default='jsonl',
+        choices=INFO_FORMATS,
+        help='Output format for --info with --list (default: jsonl)'
+    )
+    
+    parser.add_argument(
+        '--info-output',
+        type=str,
+        default='-',
+        help='File for --info with --list results, "-" for stdout (default: -)'
+    )
+    
     parser.add_argument(
         '--list-formats',
         action='store_true',
@@ -83,6 +135,181 @@ Quality options:
         help='Force convert all downloaded videos to compatible format'
     )
     
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of videos to download in parallel when using --list (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--max-transcodes',
+        type=int,
+        default=None,
+        help='Maximum number of concurrent ffmpeg conversions (default: min(jobs, CPU count))'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        type=str,
+        default=None,
+        choices=list(TRANSCODE_PROFILES),
+        help='Encoding profile for ffmpeg transcodes (default: merge for merges, compatible for conversions)'
+    )
+    
+    parser.add_argument(
+        '--connections',
+        type=int,
+        default=1,
+        help='Parallel connections per video/audio stream, via byte ranges or DASH fragments (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=str,
+        default=f'{DEFAULT_CHUNK_SIZE // (1024 * 1024)}M',
+        help='Byte range size per request when --connections > 1, e.g. 512K, 10M (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--limit-rate',
+        type=str,
+        default=None,
+        help='Total download bandwidth across all jobs, e.g. 5M (bytes per second)'
+    )
+    
+    parser.add_argument(
+        '--host-limit-rate',
+        type=str,
+        default=None,
+        help='Download bandwidth per host, e.g. 2M (bytes per second)'
+    )
+    
+    parser.add_argument(
+        '--limit-requests',
+        type=float,
+        default=None,
+        help='Total HTTP requests per second across all jobs'
+    )
+    
+    parser.add_argument(
+        '--host-limit-requests',
+        type=float,
+        default=None,
+        help='HTTP requests per second per host'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='Retries per video for network errors and throttling, with backoff (default: 3)'
+    )
+    
+    parser.add_argument(
+        '--sequential-streams',
+        action='store_true',
+        help='Download separate video and audio streams one after the other instead of in parallel'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the local metadata cache and always fetch from the network'
+    )
+    
+    parser.add_argument(
+        '--clear-cache',
+        action='store_true',
+        help='Invalidate all cached metadata before running'
+    )
+    
+    parser.add_argument(
+        '--cache-ttl',
+        type=int,
+        default=DEFAULT_CACHE_TTL,
+        help=f'Seconds before cached metadata expires (default: {DEFAULT_CACHE_TTL})'
+    )
+    
+    parser.add_argument(
+        '--no-archive',
+        action='store_true',
+        help='Do not skip videos that were already downloaded, and do not record completed ones'
+    )
+    
+    parser.add_argument(
+        '--scratch-dir',
+        type=str,
+        help='Fast directory for partial downloads, merges and conversions; finished files are moved to -o '
+             '(default: a hidden folder inside the output directory)'
+    )
+    
+    parser.add_argument(
+        '--min-free-space',
+        type=str,
+        default='512M',
+        help='Free space to leave on the scratch and output volumes; jobs wait or fail instead (default: 512M)'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        type=str,
+        metavar='FILE',
+        help='Append a JSON Lines trace of every stage (extract, transfer, probe, merge, convert) to FILE'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        type=str,
+        metavar='FILE',
+        help='Write per-stage timings, bytes, retries and transcode decisions to FILE in Prometheus text format on exit'
+    )
+    
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run as a long-lived download daemon that accepts jobs over a local HTTP API'
+    )
+    
+    parser.add_argument(
+        '--daemon-address',
+        type=str,
+        default=DEFAULT_DAEMON_ADDRESS,
+        help=f'Daemon address: host:port or unix:/path/to/socket (default: {DEFAULT_DAEMON_ADDRESS})'
+    )
+    
+    parser.add_argument(
+        '--submit',
+        action='store_true',
+        help='Queue the --url/--list videos on a running daemon instead of downloading here'
+    )
+    
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help='With --submit, wait until the submitted jobs finish'
+    )
+    
+    parser.add_argument(
+        '--job-status',
+        type=str,
+        metavar='JOB_ID',
+        help='Show the status of a daemon job'
+    )
+    
+    parser.add_argument(
+        '--cancel-job',
+        type=str,
+        metavar='JOB_ID',
+        help='Cancel a queued or running daemon job'
+    )
+    
+    parser.add_argument(
+        '--list-jobs',
+        action='store_true',
+        help='List the jobs known to the daemon'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -92,7 +319,7 @@ Quality options:
     return parser
 
 
-def handle_single_url(downloader: YouTubeDownloader, url: str, info_only: bool = False, list_formats: bool = False) -> bool:
+def handle_single_url(downloader: 'YouTubeDownloader', url: str, info_only: bool = False, list_formats: bool = False) -> bool:
     if not validate_url(url):
         print(f"{Fore.RED}✗ Invalid YouTube URL: {url}")
         return False
@@ -113,18 +340,30 @@ def handle_single_url(downloader: YouTubeDownloader, url: str, info_only: bool =
         else:
             print(f"{Fore.RED}✗ Could not get video information")
             return False
+    elif is_collection_url(url) and not extract_video_id(url):
+        stats = downloader.download_urls([url])
+        print_stats(stats)
+        return stats['successful'] > 0
     else:
         return downloader.download_video(url)
 
 
-def handle_url_list(downloader: YouTubeDownloader, file_path: str, info_only: bool = False) -> bool:
+def handle_url_list(downloader: 'YouTubeDownloader', file_path: str, info_only: bool = False,
+                    info_format: str = 'jsonl', info_output: str = '-') -> bool:
     if not Path(file_path).exists():
         print(f"{Fore.RED}✗ File not found: {file_path}")
         return False
     
     if info_only:
-        print(f"{Fore.RED}✗ Info mode not supported for URL lists")
-        return False
+        records = downloader.iter_video_info(downloader.expand_urls(downloader.read_url_list(file_path)))
+        if info_output == '-':
+            stats = write_info_records(records, sys.stdout, info_format)
+        else:
+            with open(info_output, 'w', encoding='utf-8', newline='') as stream:
+                stats = write_info_records(records, stream, info_format)
+            print(f"{Fore.GREEN}✓ Wrote metadata for {stats['total']} URLs to {info_output}")
+        print_stats(stats, file=sys.stderr if info_output == '-' else sys.stdout)
+        return stats['successful'] > 0
     
     stats = downloader.download_from_list(file_path)
     print_stats(stats)
@@ -132,33 +371,134 @@ def handle_url_list(downloader: YouTubeDownloader, file_path: str, info_only: bo
     return stats['successful'] > 0
 
 
-def main():
-    print_banner()
+def print_job(job: dict):
+    from .daemon import CANCELLED, DONE, FAILED
+    color = {DONE: Fore.GREEN, FAILED: Fore.RED, CANCELLED: Fore.YELLOW}.get(job['status'], Fore.CYAN)
+    print(f"{color}{job['id']}  {job['status']:<9}  {job['url']}")
+
+
+def handle_daemon_client(args) -> bool:
+    # Only talks to the daemon: no yt_dlp import, no ffmpeg lookup, no caches opened
+    from .daemon import DONE, DaemonClient
+    client = DaemonClient(args.daemon_address)
+    
+    if args.job_status:
+        print_job(client.status(args.job_status))
+        return True
+    if args.cancel_job:
+        job = client.cancel(args.cancel_job)
+        print(f"{Fore.YELLOW}Cancellation requested")
+        print_job(job)
+        return True
+    if args.list_jobs:
+        listing = client.list()
+        for job in listing['jobs']:
+            print_job(job)
+        print(f"{Fore.CYAN}" + ', '.join(f"{status}: {count}" for status, count in listing['counts'].items()))
+        return True
     
+    urls = [args.url] if args.url else read_url_list(args.list)
+    jobs = client.submit(urls)
+    print(f"{Fore.GREEN}✓ Queued {len(jobs)} jobs on {args.daemon_address}")
+    for job in jobs:
+        print_job(job)
+    if not args.wait:
+        return bool(jobs)
+    
+    print(f"{Fore.CYAN}Waiting for jobs to finish...")
+    results = client.wait([job['id'] for job in jobs])
+    for job in results:
+        print_job(job)
+    return bool(results) and all(job['status'] == DONE for job in results)
+
+
+def main():
     parser = create_parser()
     args = parser.parse_args()
     
+    # Batched --info streams records to stdout, so keep human-readable messages out of it
+    status = sys.stderr if (args.list and args.info and args.info_output == '-') else sys.stdout
+    print_banner(file=status)
+    
     if hasattr(args, 'convert') and args.convert:
         if not Path(args.convert).exists():
             print(f"{Fore.RED}✗ File not found: {args.convert}")
             sys.exit(1)
         
-        downloader = YouTubeDownloader(output_dir="./", quality="best")
+        # Local conversion only needs ffmpeg: skip the downloader, its caches and the yt_dlp import
+        from .converter import MediaConverter
+        from .progress import TqdmProgressReporter
+        metrics = Metrics(args.trace, args.metrics_file)
+        converter = MediaConverter(force_convert=args.force_convert, transcode_profile=args.profile,
+                                   progress_callback=TqdmProgressReporter(), metrics=metrics)
         input_file = args.convert
-        output_file = str(Path(input_file).with_stem(Path(input_file).stem + "_compatible"))
+        output_file = str(Path(input_file).with_name(Path(input_file).stem + "_compatible.mp4"))
         
-        if downloader._convert_to_compatible_mp4(input_file, output_file):
+        converted = converter.convert_to_compatible_mp4(input_file, output_file)
+        metrics.close()
+        if converted:
             print(f"{Fore.GREEN}✓ Conversion completed successfully!")
             sys.exit(0)
         else:
             print(f"{Fore.RED}✗ Conversion failed")
             sys.exit(1)
     
-    if not args.url and not args.list:
+    if args.job_status or args.cancel_job or args.list_jobs or args.submit:
+        if args.submit and not args.url and not args.list:
+            print(f"{Fore.RED}✗ --submit needs --url or --list")
+            sys.exit(1)
+        if args.list and not Path(args.list).exists():
+            print(f"{Fore.RED}✗ List file not found: {args.list}")
+            sys.exit(1)
+        from .daemon import DaemonError
+        try:
+            success = handle_daemon_client(args)
+        except (DaemonError, ValueError) as e:
+            print(f"{Fore.RED}✗ {e}")
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print(f"\n{Fore.YELLOW}⚠ Stopped waiting; the daemon keeps running the jobs")
+            sys.exit(130)
+        sys.exit(0 if success else 1)
+    
+    if not args.url and not args.list and not args.serve:
         print(f"{Fore.RED}✗ Either --url or --list is required")
         parser.print_help()
         sys.exit(1)
     
+    if args.jobs < 1:
+        print(f"{Fore.RED}✗ --jobs must be at least 1")
+        sys.exit(1)
+    
+    if args.connections < 1:
+        print(f"{Fore.RED}✗ --connections must be at least 1")
+        sys.exit(1)
+    
+    try:
+        chunk_size = parse_size(args.chunk_size)
+        min_free_space = parse_size(args.min_free_space)
+        rate_limiter = RateLimiter(
+            bytes_per_second=parse_size(args.limit_rate) if args.limit_rate else None,
+            requests_per_second=args.limit_requests,
+            host_bytes_per_second=parse_size(args.host_limit_rate) if args.host_limit_rate else None,
+            host_requests_per_second=args.host_limit_requests
+        )
+    except ValueError as e:
+        print(f"{Fore.RED}✗ {e}")
+        sys.exit(1)
+    
+    quality_rules = {}
+    if args.quality_file:
+        try:
+            quality_rules = load_quality_rules(args.quality_file)
+        except (OSError, ValueError) as e:
+            print(f"{Fore.RED}✗ Could not load quality profiles: {e}")
+            sys.exit(1)
+    
+    if args.quality not in QUALITY_RULES and args.quality not in quality_rules:
+        print(f"{Fore.RED}✗ Unknown quality: {args.quality}")
+        sys.exit(1)
+    
     if args.list and not Path(args.list).exists():
         print(f"{Fore.RED}✗ List file not found: {args.list}")
         sys.exit(1)
@@ -170,19 +510,62 @@ def main():
         print(f"{Fore.RED}✗ Could not create output directory: {e}")
         sys.exit(1)
     
-    print(f"{Fore.CYAN}Initializing downloader...")
-    print(f"{Fore.CYAN}Quality: {args.quality}")
-    print(f"{Fore.CYAN}Output directory: {output_path.absolute()}")
-    print()
+    print(f"{Fore.CYAN}Initializing downloader...", file=status)
+    print(f"{Fore.CYAN}Quality: {args.quality}", file=status)
+    print(f"{Fore.CYAN}Output directory: {output_path.absolute()}", file=status)
+    print(file=status)
+    
+    try:
+        metrics = Metrics(args.trace, args.metrics_file)
+    except OSError as e:
+        print(f"{Fore.RED}✗ Could not open trace file: {e}")
+        sys.exit(1)
     
+    from .downloader import YouTubeDownloader
+    from .progress import TqdmProgressReporter
     downloader = YouTubeDownloader(
         output_dir=str(output_path),
         quality=args.quality,
-        force_convert=getattr(args, 'force_convert', False)
+        force_convert=getattr(args, 'force_convert', False),
+        jobs=args.jobs,
+        max_transcodes=args.max_transcodes,
+        use_cache=not args.no_cache,
+        cache_ttl=args.cache_ttl,
+        transcode_profile=args.profile,
+        progress_callback=TqdmProgressReporter(),
+        use_archive=not args.no_archive,
+        connections=args.connections,
+        chunk_size=chunk_size,
+        quality_rules=quality_rules,
+        stream_audio=args.stream_audio,
+        audio_format=args.audio_format,
+        rate_limiter=rate_limiter,
+        retries=args.retries,
+        parallel_streams=not args.sequential_streams,
+        metrics=metrics,
+        scratch_dir=args.scratch_dir,
+        min_free_space=min_free_space
     )
     
+    if args.clear_cache:
+        downloader.cache.invalidate()
+        print(f"{Fore.CYAN}Metadata cache cleared")
+    
     success = False
     
+    if args.serve:
+        from .daemon import DownloadDaemon
+        try:
+            DownloadDaemon(downloader, args.daemon_address).run()
+        except KeyboardInterrupt:
+            print(f"\n{Fore.YELLOW}⚠ Daemon stopped")
+            sys.exit(0)
+        except (OSError, ValueError) as e:
+            print(f"{Fore.RED}✗ Daemon failed: {e}")
+            sys.exit(1)
+        finally:
+            downloader.close()
+    
     try:
         if args.url:
             success = handle_single_url(downloader, args.url, args.info, getattr(args, 'list_formats', False))
@@ -190,17 +573,19 @@ def main():
             if getattr(args, 'list_formats', False):
                 print(f"{Fore.RED}✗ Format listing not supported for URL lists")
                 sys.exit(1)
-            success = handle_url_list(downloader, args.list, args.info)
+            success = handle_url_list(downloader, args.list, args.info, args.info_format, args.info_output)
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}⚠ Download interrupted by user")
         sys.exit(130)
     except Exception as e:
         print(f"{Fore.RED}✗ Unexpected error: {e}")
         sys.exit(1)
+    finally:
+        downloader.close()
     
     if success:
-        print(f"\n{Fore.GREEN}✓ Operation completed successfully!")
+        print(f"\n{Fore.GREEN}✓ Operation completed successfully!", file=status)
         sys.exit(0)
     else:
-        print(f"\n{Fore.RED}✗ Operation failed")
+        print(f"\n{Fore.RED}✗ Operation failed", file=status)
         sys.exit(1)
\ No newline at end of file
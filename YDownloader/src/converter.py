@@ -0,0 +1,230 @@
+import os
+import functools
+import shutil
+import subprocess
+import platform
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .media import PLAN_NONE, TRANSCODE_PROFILES, describe_plan, plan_conversion
+from .metrics import Metrics
+from .probe import ProbeService
+from .progress import ProgressCallback
+from .transcode import TranscodeEngine
+
+
+@functools.lru_cache(maxsize=None)
+def find_executable(name: str) -> Optional[str]:
+    return shutil.which(name)
+
+
+class MediaConverter:
+    
+    def __init__(self, force_convert: bool = False, max_transcodes: int = 1, transcode_profile: Optional[str] = None,
+                 progress_callback: Optional[ProgressCallback] = None, metrics: Optional[Metrics] = None):
+        if transcode_profile is not None and transcode_profile not in TRANSCODE_PROFILES:
+            raise ValueError(f"Unknown transcode profile: {transcode_profile}")
+        self.force_convert = force_convert
+        self.max_transcodes = max(1, max_transcodes)
+        self.transcode_profile = transcode_profile
+        self.progress_callback = progress_callback
+        self.metrics = metrics or Metrics()
+        self._transcode_slots = threading.BoundedSemaphore(self.max_transcodes)
+        self._discovery_lock = threading.Lock()
+        self._ffmpeg_checked = False
+        # Shared by planning, merging, progress (duration) and the compatibility check: one ffprobe per file
+        self.probes = ProbeService(self.ffprobe_command, metrics=self.metrics)
+    
+    def ffmpeg_command(self) -> Optional[str]:
+        with self._discovery_lock:
+            if not self._ffmpeg_checked:
+                self._ffmpeg_checked = True
+                if not find_executable('ffmpeg'):
+                    print("🔧 ffmpeg not found. Installing automatically...")
+                    self._install_ffmpeg()
+                    find_executable.cache_clear()
+        return find_executable('ffmpeg') or getattr(self, 'ffmpeg_path', None)
+    
+    def _install_ffmpeg(self):
+        try:
+            if platform.system() == "Windows":
+                print("📦 Installing ffmpeg via winget...")
+                result = subprocess.run(
+                    ["winget", "install", "ffmpeg", "--accept-source-agreements", "--accept-package-agreements"],
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='ignore',
+                    timeout=300
+                )
+                if result.returncode == 0:
+                    print("✅ ffmpeg installed successfully!")
+                    self._add_ffmpeg_to_path()
+                else:
+                    print("⚠️  Could not install ffmpeg automatically. Please install manually.")
+                    print("   Download from: https://ffmpeg.org/download.html")
+            else:
+                print("⚠️  Auto-install only supported on Windows. Please install ffmpeg manually.")
+        except Exception as e:
+            print(f"⚠️  Error installing ffmpeg: {e}")
+            print("   Please install manually from: https://ffmpeg.org/download.html")
+    
+    def _add_ffmpeg_to_path(self):
+        if platform.system() == "Windows":
+            possible_paths = [
+                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-7.1.1-full_build\bin"),
+                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-7.0.2-full_build\bin"),
+                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-*-full_build\bin")
+            ]
+            
+            for path in possible_paths:
+                if os.path.exists(path.replace("*", "7.1.1")):
+                    os.environ["PATH"] = os.environ["PATH"] + ";" + path.replace("*", "7.1.1")
+                    self.ffmpeg_path = os.path.join(path.replace("*", "7.1.1"), "ffmpeg.exe")
+                    return
+                elif os.path.exists(path.replace("*", "7.0.2")):
+                    os.environ["PATH"] = os.environ["PATH"] + ";" + path.replace("*", "7.0.2")
+                    self.ffmpeg_path = os.path.join(path.replace("*", "7.0.2"), "ffmpeg.exe")
+                    return
+            
+            winget_packages = os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages")
+            if os.path.exists(winget_packages):
+                for item in os.listdir(winget_packages):
+                    if "FFmpeg" in item:
+                        ffmpeg_dir = os.path.join(winget_packages, item)
+                        for subdir in os.listdir(ffmpeg_dir):
+                            if "ffmpeg-" in subdir and "full_build" in subdir:
+                                bin_path = os.path.join(ffmpeg_dir, subdir, "bin")
+                                if os.path.exists(bin_path):
+                                    os.environ["PATH"] = os.environ["PATH"] + ";" + bin_path
+                                    self.ffmpeg_path = os.path.join(bin_path, "ffmpeg.exe")
+                                    return
+        
+    def conversion_plan(self, file_path: str) -> Dict[str, Optional[str]]:
+        media = self.probe(file_path)
+        if 'video' not in media and 'audio' not in media:
+            # Without a usable probe we cannot prove anything is compatible, so convert everything
+            return plan_conversion('unknown', 'unknown', Path(file_path).suffix, self.force_convert)
+        return plan_conversion(media.get('video'), media.get('audio'), Path(file_path).suffix, self.force_convert)
+    
+    def _transcode_engine(self, ffmpeg_cmd: str) -> TranscodeEngine:
+        # Split the cores between the transcodes that may run at the same time
+        return TranscodeEngine(ffmpeg_cmd, workers=max(1, (os.cpu_count() or 1) // self.max_transcodes),
+                               on_progress=self.progress_callback)
+    
+    def _timed_run(self, operation: str, plan: Dict[str, Optional[str]], output_file: str,
+                   run: Callable[[], Tuple[bool, str]]) -> Tuple[bool, str]:
+        decision = 'transcode' if 'transcode' in (plan.get('video'), plan.get('audio')) else 'remux'
+        self.metrics.count('transcode_decisions', operation=operation, decision=decision)
+        # Started after a transcode slot is acquired, so queueing for ffmpeg is not counted as encoding time
+        with self.metrics.span(operation, decision=decision, video=plan.get('video'), audio=plan.get('audio')) as span:
+            success, error = run()
+            span.set(status='ok' if success else 'failed')
+            if success:
+                span.set(bytes=lambda: os.path.getsize(output_file) if os.path.exists(output_file) else 0)
+        return success, error
+    
+    def merge_video_audio(self, video_file: str, audio_file: str, output_file: str) -> bool:
+        ffmpeg_cmd = self.ffmpeg_command()
+        if not ffmpeg_cmd:
+            print("❌ ffmpeg not available for merging")
+            return False
+        
+        try:
+            video_media = self.probe(video_file)
+            video_codec = video_media.get('video')
+            audio_codec = self.probe(audio_file).get('audio')
+            plan = plan_conversion(video_codec or 'unknown', audio_codec or 'unknown', 'mp4', self.force_convert)
+            engine = self._transcode_engine(ffmpeg_cmd)
+            profile = self.transcode_profile or 'merge'
+            
+            if plan['video'] == 'copy' and plan['audio'] == 'copy':
+                print(f"⚡ Stream-copying {video_codec} video and {audio_codec} audio into MP4 (no re-encode)...")
+                success, error = self._timed_run('merge', plan, output_file, lambda: engine.run(
+                    video_file, output_file, plan, profile, audio_file, video_media.get('duration')))
+            else:
+                print(f"🔧 Merging to compatible MP4: {describe_plan(plan, video_codec, audio_codec)}...")
+                with self._transcode_slots:
+                    success, error = self._timed_run('merge', plan, output_file, lambda: engine.run(
+                        video_file, output_file, plan, profile, audio_file, video_media.get('duration')))
+            
+            if success:
+                print(f"✅ Successfully converted to: {output_file}")
+                os.remove(video_file)
+                os.remove(audio_file)
+                print(f"🗑️  Cleaned up temporary files")
+                return True
+            else:
+                print(f"❌ Error converting files: {error}")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Error during conversion: {e}")
+            return False
+    
+    def convert_to_compatible_mp4(self, input_file: str, output_file: str, plan: Optional[Dict[str, Optional[str]]] = None) -> bool:
+        ffmpeg_cmd = self.ffmpeg_command()
+        if not ffmpeg_cmd:
+            print("❌ ffmpeg not available for conversion")
+            return False
+        
+        try:
+            if plan is None:
+                plan = self.conversion_plan(input_file)
+                # Nothing to fix, but the caller asked for a separate output file: remux into it
+                if plan['action'] == PLAN_NONE and input_file == output_file:
+                    print(f"✅ Codecs are already compatible!")
+                    return True
+            
+            duration = self.probe(input_file).get('duration')
+            engine = self._transcode_engine(ffmpeg_cmd)
+            profile = self.transcode_profile or 'compatible'
+
+            if plan['video'] == 'transcode' or plan['audio'] == 'transcode':
+                print(f"🔄 Converting to Windows Media Player compatible format: {plan['action']} ({plan['video'] or '-'} video, {plan['audio'] or '-'} audio)...")
+                with self._transcode_slots:
+                    success, error = self._timed_run('convert', plan, output_file, lambda: engine.run(
+                        input_file, output_file, plan, profile, duration=duration))
+            else:
+                print(f"⚡ Remuxing to MP4 without re-encoding...")
+                success, error = self._timed_run('convert', plan, output_file, lambda: engine.run(
+                    input_file, output_file, plan, profile, duration=duration))
+            
+            if success:
+                print(f"✅ Successfully converted to: {output_file}")
+                if input_file != output_file and os.path.exists(output_file):
+                    os.remove(input_file)
+                    print(f"🗑️  Replaced original file")
+                return True
+            else:
+                print(f"❌ Error converting file: {error}")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Error during conversion: {e}")
+            return False
+    
+    def ffprobe_command(self) -> Optional[str]:
+        self.ffmpeg_command()
+        ffprobe_cmd = find_executable('ffprobe')
+        if not ffprobe_cmd and hasattr(self, 'ffmpeg_path'):
+            ffprobe_path = self.ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')
+            if os.path.exists(ffprobe_path):
+                ffprobe_cmd = ffprobe_path
+        return ffprobe_cmd
+    
+    def probe(self, file_path: str) -> Dict:
+        return self.probes.probe(file_path)
+    
+    def check_codec_compatibility(self, file_path: str) -> bool:
+        media = self.probe(file_path)
+        if not media:
+            return False
+        
+        problematic_codecs = ['av01', 'vp9', 'opus', 'vorbis']
+        for codec in media['codecs']:
+            if any(prob in codec for prob in problematic_codecs):
+                print(f"⚠️  Detected problematic codec: {codec}")
+                return False
+        return True
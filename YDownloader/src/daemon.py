@@ -0,0 +1,353 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from .defaults import DEFAULT_DAEMON_ADDRESS
+from .utils import extract_video_id, is_collection_url
+
+if TYPE_CHECKING:
+    from .downloader import YouTubeDownloader
+
+DEFAULT_ADDRESS = DEFAULT_DAEMON_ADDRESS
+UNIX_PREFIX = 'unix:'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = {DONE, FAILED, CANCELLED}
+
+
+class DaemonError(Exception):
+    pass
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    # "unix:/path/to/socket" is a Unix socket path, anything else is "host:port"
+    if address.startswith(UNIX_PREFIX):
+        return address[len(UNIX_PREFIX):]
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid daemon address '{address}', expected host:port or unix:/path")
+    return host.strip('[]'), int(port)
+
+
+class Job:
+
+    def __init__(self, url: str, collection: bool = False, parent: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.parent = parent
+        self.status = QUEUED
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancelled = threading.Event()
+        # A playlist or channel is listed rather than downloaded; every video in it becomes a child job
+        self.collection = collection
+        self.children: List[str] = []
+
+    def to_dict(self) -> Dict:
+        data = {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+        if self.collection:
+            data['children'] = list(self.children)
+        return data
+
+
+class DownloadDaemon:
+
+    MAX_HISTORY = 1000
+    # Finished jobs stay at least this long, so a polling client sees how they ended
+    KEEP_FINISHED = 300
+    MAX_BODY = 1024 * 1024
+    LISTING_WORKERS = 2
+
+    def __init__(self, downloader: 'YouTubeDownloader', address: str = DEFAULT_ADDRESS,
+                 workers: Optional[int] = None):
+        self.downloader = downloader
+        self.address = address
+        self.workers = max(1, workers or downloader.jobs)
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ydl-daemon')
+        # Listing collections gets its own threads, so a busy download pool never delays a submit
+        self._lister = ThreadPoolExecutor(max_workers=self.LISTING_WORKERS, thread_name_prefix='ydl-daemon-list')
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._lister.shutdown(wait=False, cancel_futures=True)
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+        print(f"🔥 Warming up downloader...")
+        await loop.run_in_executor(self._executor, self.downloader.warm_up)
+
+        target = parse_address(self.address)
+        if isinstance(target, str):
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            server = await asyncio.start_server(self._handle, target[0], target[1])
+        workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        print(f"📡 Daemon listening on {self.address} with {self.workers} workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(loop, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, loop: asyncio.AbstractEventLoop, job: Job):
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            # Downloads block, so they run on the thread pool while the loop keeps answering requests
+            success = await loop.run_in_executor(self._executor, self.downloader.download_video,
+                                                 job.url, job.cancelled)
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            success = False
+        job.status = CANCELLED if job.cancelled.is_set() else DONE if success else FAILED
+        job.finished = time.time()
+        self._prune()
+        # The daemon never exits cleanly on its own, so keep the metrics file current per job
+        self.downloader.metrics.write_prometheus()
+
+    def _prune(self):
+        excess = len(self.jobs) - self.MAX_HISTORY
+        cutoff = time.time() - self.KEEP_FINISHED
+        for job in list(self.jobs.values()):
+            if excess <= 0:
+                return
+            if job.parent or job.id not in self.jobs:
+                continue
+            # A collection goes with all of its videos, once all of them are done, so --wait never loses one
+            group = [job] + [self.jobs[child] for child in job.children if child in self.jobs]
+            if all(member.status in FINISHED and member.finished <= cutoff for member in group):
+                for member in group:
+                    del self.jobs[member.id]
+                excess -= len(group)
+
+    def _enqueue(self, url: str, parent: Optional[str] = None) -> Job:
+        job = Job(url, parent=parent)
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def submit(self, urls: Iterable[str]) -> List[Job]:
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for url in urls:
+            if extract_video_id(url) or not is_collection_url(url):
+                jobs.append(self._enqueue(url))
+                continue
+            # Listing a channel can take minutes, so answer now and queue its videos as the pages come in
+            job = Job(url, collection=True)
+            job.status = RUNNING
+            job.started = time.time()
+            self.jobs[job.id] = job
+            loop.run_in_executor(self._lister, self._list_collection, loop, job)
+            jobs.append(job)
+        return jobs
+
+    def _list_collection(self, loop: asyncio.AbstractEventLoop, job: Job):
+        listing = self.downloader.expand_urls([job.url])
+        try:
+            for url in listing:
+                if job.cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(self._add_child, job, url)
+        except Exception as e:
+            print(f"❌ Listing {job.url} failed: {e}")
+        finally:
+            listing.close()
+            loop.call_soon_threadsafe(self._finish_listing, job)
+
+    def _add_child(self, job: Job, url: str):
+        if not job.cancelled.is_set():
+            job.children.append(self._enqueue(url, job.id).id)
+
+    def _finish_listing(self, job: Job):
+        job.status = CANCELLED if job.cancelled.is_set() else DONE if job.children else FAILED
+        job.finished = time.time()
+        self._prune()
+
+    def cancel(self, job: Job):
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished = time.time()
+        # A running download notices on its next progress update and stops; a listing stops at its next entry
+        job.cancelled.set()
+        for child_id in job.children:
+            child = self.jobs.get(child_id)
+            if child and child.status not in FINISHED:
+                self.cancel(child)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        parts = [part for part in path.split('/') if part]
+        if parts == ['jobs']:
+            if method == 'GET':
+                return 200, {'jobs': [job.to_dict() for job in self.jobs.values()], 'counts': self.counts()}
+            if method == 'POST':
+                payload = json.loads(body or b'{}')
+                if not isinstance(payload, dict):
+                    return 400, {'error': "Expected a JSON object with 'url' or 'urls'"}
+                urls = payload.get('urls') or ([payload['url']] if payload.get('url') else [])
+                if not urls or not all(isinstance(url, str) for url in urls):
+                    return 400, {'error': "Expected 'url' or a list of 'urls'"}
+                jobs = self.submit(urls)
+                return 201, {'jobs': [job.to_dict() for job in jobs]}
+            return 405, {'error': f"{method} not allowed on /jobs"}
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {'error': f"No such job: {parts[1]}"}
+            if method == 'GET':
+                return 200, job.to_dict()
+            if method == 'DELETE':
+                if job.status in FINISHED:
+                    return 409, {'error': f"Job {job.id} already {job.status}"}
+                self.cancel(job)
+                return 200, job.to_dict()
+            return 405, {'error': f"{method} not allowed on /jobs/<id>"}
+
+        return 404, {'error': f"Not found: {path}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1')
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length') or 0)
+            if length > self.MAX_BODY:
+                status, payload = 413, {'error': 'Request body too large'}
+            else:
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._dispatch(method.upper(), urlparse(target).path, body)
+        except (ValueError, KeyError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {'error': f"Bad request: {e}"}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+
+        data = json.dumps(payload).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonClient:
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = 30):
+        self.address = address
+        self.target = parse_address(address)
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Dict:
+        if isinstance(self.target, str):
+            connection = _UnixHTTPConnection(self.target, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.target[0], self.target[1], timeout=self.timeout)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = json.loads(response.read() or b'{}')
+        except OSError as e:
+            raise DaemonError(f"Could not reach daemon at {self.address}: {e}")
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise DaemonError(data.get('error') or f"HTTP {response.status}")
+        return data
+
+    def submit(self, urls: List[str]) -> List[Dict]:
+        return self._request('POST', '/jobs', {'urls': urls})['jobs']
+
+    def status(self, job_id: str) -> Dict:
+        return self._request('GET', f'/jobs/{job_id}')
+
+    def cancel(self, job_id: str) -> Dict:
+        return self._request('DELETE', f'/jobs/{job_id}')
+
+    def list(self) -> Dict:
+        return self._request('GET', '/jobs')
+
+    def wait(self, job_ids: List[str], interval: float = 1.0) -> List[Dict]:
+        pending = list(job_ids)
+        order = list(job_ids)
+        results = {}
+        while pending:
+            for job_id in list(pending):
+                job = self.status(job_id)
+                if job['status'] in FINISHED:
+                    results[job_id] = job
+                    pending.remove(job_id)
+                    # A listed collection is only done once the videos it queued are
+                    children = [child for child in job.get('children', []) if child not in order]
+                    pending.extend(children)
+                    order.extend(children)
+            if pending:
+                time.sleep(interval)
+        return [results[job_id] for job_id in order]
@@ -0,0 +1,5 @@
+# Defaults shared by the CLI parser and the modules that use them. Kept free of imports so that
+# building the parser (--help, --version) does not load the daemon, cache or accelerator modules.
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+DEFAULT_CACHE_TTL = 3 * 3600
+DEFAULT_DAEMON_ADDRESS = '127.0.0.1:8765'
@@ -1,104 +1,104 @@
 import os
-import yt_dlp
-from pathlib import Path
-from typing import Dict, List, Optional
-import shutil
-import subprocess
 import sys
-import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .accelerator import DEFAULT_CHUNK_SIZE, RangeDownloader
+from .archive import DownloadArchive
+from .audio_stream import iter_ranges, iter_response, stream_audio, until_cancelled
+from .cache import MetadataCache
+from .converter import MediaConverter
+from .media import PLAN_NONE
+from .metrics import Metrics
+from .pipeline import FetchPostprocessPipeline
+from .playlist import entry_url, is_nested_collection, iter_entries
+from .progress import ProgressCallback
+from .ratelimit import RateLimiter
+from .retry import NETWORK, POSTPROCESS, UNKNOWN, DownloadFailure, FailureCounter, RetryPolicy, classify_error
+from .quality import QUALITY_RULES, describe_selection, format_spec, select_formats
+from .scheduler import BatchScheduler
+from .session import SessionPool
+from .staging import DEFAULT_MIN_FREE, ScratchSpace, estimate_download_size
+from .tracking import VIDEO_EXTENSIONS, OutputTracker, output_base
+from .utils import extract_video_id, is_collection_url, read_url_list
 
 
 class YouTubeDownloader:
     
-    def __init__(self, output_dir: str = "downloads", quality: str = "best", force_convert: bool = False):
+    MAX_EXPANSION_DEPTH = 2
+    
+    def __init__(self, output_dir: str = "downloads", quality: str = "best", force_convert: bool = False,
+                 jobs: int = 1, max_transcodes: Optional[int] = None,
+                 use_cache: bool = True, cache_ttl: int = MetadataCache.DEFAULT_TTL,
+                 transcode_profile: Optional[str] = None, progress_callback: Optional[ProgressCallback] = None,
+                 use_archive: bool = True, connections: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 quality_rules: Optional[Dict[str, Dict]] = None, stream_audio: bool = False,
+                 audio_format: str = 'mp3', rate_limiter: Optional[RateLimiter] = None, retries: int = 3,
+                 parallel_streams: bool = True, metrics: Optional[Metrics] = None,
+                 scratch_dir: Optional[str] = None, min_free_space: int = DEFAULT_MIN_FREE):
         os.environ['PYTHONIOENCODING'] = 'utf-8'
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.quality = quality
+        self.quality_rules = {**QUALITY_RULES, **(quality_rules or {})}
+        self.stream_audio = stream_audio
+        self.audio_format = audio_format
         self.force_convert = force_convert
-        self._check_ffmpeg()
+        # Disabled unless a trace or metrics file was asked for; spans are then no-ops
+        self.metrics = metrics or Metrics()
+        self.jobs = max(1, jobs)
+        self.max_transcodes = max(1, max_transcodes or min(self.jobs, os.cpu_count() or 1))
+        # ffmpeg discovery (and the winget install fallback) happens on first use, not here
+        self.converter = MediaConverter(force_convert=force_convert, max_transcodes=self.max_transcodes,
+                                        transcode_profile=transcode_profile, progress_callback=progress_callback,
+                                        metrics=self.metrics)
+        self.cache = MetadataCache(self.output_dir / '.ydownloader_cache.sqlite', ttl=cache_ttl, enabled=use_cache)
+        self.archive = DownloadArchive(self.output_dir / '.ydownloader_archive.sqlite', enabled=use_archive)
+        self.scratch = ScratchSpace(self.output_dir, Path(scratch_dir) if scratch_dir else None, min_free_space)
+        self.scratch.cleanup_orphans()
+        self.connections = max(1, connections)
+        self.chunk_size = chunk_size
+        # One connection means plain yt-dlp downloads; more split each format into parallel byte ranges
+        self.accelerator = RangeDownloader(self.connections, chunk_size) if self.connections > 1 else None
+        # Shared by every session, so limits and 429/403 backoff hold across parallel jobs
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.sessions = SessionPool(self.accelerator, self.rate_limiter)
+        self.retry_policy = RetryPolicy(retries)
+        self.failures = FailureCounter()
+        self.parallel_streams = parallel_streams
+        self.stream_timings = {'video': 0.0, 'audio': 0.0}
+        self._timings_lock = threading.Lock()
     
-    def _check_ffmpeg(self):
-        if not shutil.which('ffmpeg'):
-            print("🔧 ffmpeg not found. Installing automatically...")
-            self._install_ffmpeg()
+    def close(self):
+        self.sessions.close()
+        self.cache.close()
+        self.archive.close()
+        self.metrics.close()
+    
+    def _merge_video_audio(self, video_file: str, audio_file: str, output_file: str) -> bool:
+        return self.converter.merge_video_audio(video_file, audio_file, output_file)
+    
+    def _convert_to_compatible_mp4(self, input_file: str, output_file: str, plan: Optional[Dict[str, Optional[str]]] = None) -> bool:
+        return self.converter.convert_to_compatible_mp4(input_file, output_file, plan)
+    
+    def _check_codec_compatibility(self, file_path: str) -> bool:
+        return self.converter.check_codec_compatibility(file_path)
     
-    def _install_ffmpeg(self):
-        try:
-            if platform.system() == "Windows":
-                print("📦 Installing ffmpeg via winget...")
-                result = subprocess.run(
-                    ["winget", "install", "ffmpeg", "--accept-source-agreements", "--accept-package-agreements"],
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8',
-                    errors='ignore',
-                    timeout=300
-                )
-                if result.returncode == 0:
-                    print("✅ ffmpeg installed successfully!")
-                    self._add_ffmpeg_to_path()
-                else:
-                    print("⚠️  Could not install ffmpeg automatically. Please install manually.")
-                    print("   Download from: https://ffmpeg.org/download.html")
-            else:
-                print("⚠️  Auto-install only supported on Windows. Please install ffmpeg manually.")
-        except Exception as e:
-            print(f"⚠️  Error installing ffmpeg: {e}")
-            print("   Please install manually from: https://ffmpeg.org/download.html")
-    
-    def _add_ffmpeg_to_path(self):
-        if platform.system() == "Windows":
-            possible_paths = [
-                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-7.1.1-full_build\bin"),
-                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-7.0.2-full_build\bin"),
-                os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-*-full_build\bin")
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path.replace("*", "7.1.1")):
-                    os.environ["PATH"] = os.environ["PATH"] + ";" + path.replace("*", "7.1.1")
-                    self.ffmpeg_path = os.path.join(path.replace("*", "7.1.1"), "ffmpeg.exe")
-                    return
-                elif os.path.exists(path.replace("*", "7.0.2")):
-                    os.environ["PATH"] = os.environ["PATH"] + ";" + path.replace("*", "7.0.2")
-                    self.ffmpeg_path = os.path.join(path.replace("*", "7.0.2"), "ffmpeg.exe")
-                    return
-            
-            winget_packages = os.path.expandvars(r"%LOCALAPPDATA%\Microsoft\WinGet\Packages")
-            if os.path.exists(winget_packages):
-                for item in os.listdir(winget_packages):
-                    if "FFmpeg" in item:
-                        ffmpeg_dir = os.path.join(winget_packages, item)
-                        for subdir in os.listdir(ffmpeg_dir):
-                            if "ffmpeg-" in subdir and "full_build" in subdir:
-                                bin_path = os.path.join(ffmpeg_dir, subdir, "bin")
-                                if os.path.exists(bin_path):
-                                    os.environ["PATH"] = os.environ["PATH"] + ";" + bin_path
-                                    self.ffmpeg_path = os.path.join(bin_path, "ffmpeg.exe")
-                                    return
-        
     def get_ydl_opts(self) -> Dict:
-        quality_formats = {
-            'best': 'bestvideo[vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[vcodec!*=av01]+bestaudio[acodec!*=opus]/best[ext=mp4]/best',
-            'ultra': 'bestvideo[height>=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/bestvideo[height>=1440][vcodec!*=av01]+bestaudio[acodec!*=opus]/bestvideo+bestaudio/best',
-            '4k': 'bestvideo[height>=2160][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=2160]',
-            '1440p': 'bestvideo[height>=1440][height<=2160][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=1440][height<=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=1440][height<=2160]',
-            '1080p': 'bestvideo[height>=1080][height<=1440][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=1080][height<=1440][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=1080][height<=1440]',
-            '720p': 'bestvideo[height>=720][height<=1080][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=720][height<=1080][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=720][height<=1080]',
-            '480p': 'bestvideo[height>=480][height<=720][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=480][height<=720][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=480][height<=720]',
-            '360p': 'bestvideo[height>=360][height<=480][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=360][height<=480][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=360][height<=480]',
-            'worst': 'worst[ext=mp4]/worst',
-            'audio': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio'
-        }
-        
-        format_selector = quality_formats.get(self.quality, self.quality)
+        rule = self.quality_rules.get(self.quality)
+        # Known profiles compile (once) to a yt-dlp format spec; anything else is passed through as a raw spec
+        format_selector = format_spec(rule) if rule else self.quality
         
         opts = {
             'format': format_selector,
-            'outtmpl': str(self.output_dir / '%(title)s.%(ext)s'),
+            # Downloads, merges and conversions all happen in scratch; finished files are moved out (see _publish_outputs)
+            'outtmpl': str(self.scratch.scratch_dir / '%(title)s.%(ext)s'),
             'restrictfilenames': True,
-            'noplaylist': False,
+            # Playlists and channels are expanded up front (see expand_urls), one job per video
+            'noplaylist': True,
             'ignoreerrors': True,
             'writesubtitles': False,
             'writeautomaticsub': False,
@@ -106,19 +106,26 @@ class YouTubeDownloader:
             'merge_output_format': 'mp4',
             'prefer_ffmpeg': True,
             'keepvideo': False,
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
+            # Resume .part files and fragment downloads; a missing fragment is an error to retry, not a gap
+            'continuedl': True,
+            'skip_unavailable_fragments': False,
         }
         
-        if self.quality == 'audio':
+        if self.accelerator:
+            # DASH/HLS formats go through yt-dlp's own fragment downloader, in parallel;
+            # single-file formats that cannot be split still get fetched in chunked requests
+            opts['concurrent_fragment_downloads'] = self.connections
+            opts['http_chunk_size'] = self.chunk_size
+        
+        # Video conversion is planned once per file after download (see _plan_conversion),
+        # so no FFmpegVideoConvertor here: it would re-encode before we even probe the codecs
+        if rule and rule.get('audio_only'):
             opts.update({
-                'extractaudio': True,
-                'audioformat': 'mp3',
-                'audioquality': '0',
-                'audio_quality': 0,
-                'format': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio'
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': self.audio_format,
+                    'preferredquality': '0',
+                }],
             })
         else:
             opts.update({
@@ -132,231 +139,431 @@ class YouTubeDownloader:
         
         return opts
     
-    def _merge_video_audio(self, video_file: str, audio_file: str, output_file: str) -> bool:
-        ffmpeg_cmd = shutil.which('ffmpeg')
-        if not ffmpeg_cmd and hasattr(self, 'ffmpeg_path'):
-            ffmpeg_cmd = self.ffmpeg_path
-        
-        if not ffmpeg_cmd:
-            print("❌ ffmpeg not available for merging")
-            return False
-        
-        try:
-            cmd = [
-                ffmpeg_cmd,
-                '-i', video_file,
-                '-i', audio_file,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-ac', '2',
-                '-ar', '48000',
-                '-ab', '192k',
-                '-preset', 'fast',
-                '-crf', '23',
-                '-movflags', '+faststart',
-                '-f', 'mp4',
-                '-y',
-                output_file
-            ]
-            
-            print(f"🔧 Converting and merging to compatible MP4...")
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+    def _extract_info(self, ydl, url: str, announce: bool = True) -> Optional[Dict]:
+        video_id = extract_video_id(url)
+        with self.metrics.span('extract', url=url) as span:
+            info = self.cache.get(video_id)
+            if info is not None:
+                span.set(cached=True)
+                if announce:
+                    print(f"💾 Using cached metadata for {video_id}")
+                return info
             
-            if result.returncode == 0:
-                print(f"✅ Successfully converted to: {output_file}")
-                os.remove(video_file)
-                os.remove(audio_file)
-                print(f"🗑️  Cleaned up temporary files")
-                return True
-            else:
-                print(f"❌ Error converting files: {result.stderr}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error during conversion: {e}")
-            return False
+            span.set(cached=False)
+            info = ydl.extract_info(url, download=False)
+            if info and info.get('_type', 'video') == 'video':
+                # Sanitizing drops yt-dlp's own format pick; the cache can do without it, this run cannot
+                requested = info.get('requested_formats')
+                info = ydl.sanitize_info(info, remove_private_keys=True)
+                self.cache.put(info.get('id') or video_id, info)
+                if requested:
+                    info['requested_formats'] = requested
+            return info
     
-    def _convert_to_compatible_mp4(self, input_file: str, output_file: str) -> bool:
-        ffmpeg_cmd = shutil.which('ffmpeg')
-        if not ffmpeg_cmd and hasattr(self, 'ffmpeg_path'):
-            ffmpeg_cmd = self.ffmpeg_path
-        
-        if not ffmpeg_cmd:
-            print("❌ ffmpeg not available for conversion")
-            return False
-        
+    def list_formats(self, url: str) -> bool:
         try:
-            cmd = [
-                ffmpeg_cmd,
-                '-i', input_file,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-ac', '2',
-                '-ar', '48000',
-                '-ab', '192k',
-                '-profile:v', 'main',
-                '-level', '3.1',
-                '-preset', 'fast',
-                '-crf', '23',
-                '-pix_fmt', 'yuv420p',
-                '-movflags', '+faststart',
-                '-f', 'mp4',
-                '-strict', 'experimental',
-                '-avoid_negative_ts', 'make_zero',
-                '-y',
-                output_file
-            ]
-
-            print(f"🔄 Converting to Windows Media Player compatible format...")
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore', timeout=1800)
-            
-            if result.returncode == 0:
-                print(f"✅ Successfully converted to: {output_file}")
-                if input_file != output_file and os.path.exists(output_file):
-                    os.remove(input_file)
-                    print(f"🗑️  Replaced original file")
+            with self.sessions.session('formats', lambda: {'quiet': False}) as session:
+                ydl = session.ydl
+                info = self._extract_info(ydl, url)
+                if not info:
+                    return False
+                ydl.list_formats(info)
                 return True
-            else:
-                print(f"❌ Error converting file: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print(f"❌ Conversion timeout - file too large")
-            return False
         except Exception as e:
-            print(f"❌ Error during conversion: {e}")
+            print(f"✗ Error getting formats for {url}: {str(e)}")
             return False
     
-    def _check_codec_compatibility(self, file_path: str) -> bool:
-        ffprobe_cmd = shutil.which('ffprobe')
-        if not ffprobe_cmd and hasattr(self, 'ffmpeg_path'):
-            ffprobe_path = self.ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')
-            if os.path.exists(ffprobe_path):
-                ffprobe_cmd = ffprobe_path
-        
-        if not ffprobe_cmd:
-            return False
-        
-        try:
-            cmd = [
-                ffprobe_cmd,
-                '-v', 'quiet',
-                '-show_entries', 'stream=codec_name',
-                '-of', 'csv=p=0',
-                file_path
-            ]
+    def _report_best_height(self, info: Dict):
+        formats = info.get('formats') or []
+        heights = [f['height'] for f in formats if f.get('height')]
+        if heights:
+            print(f"📺 Best available quality: {max(heights)}p")
+    
+    def select_formats(self, info: Dict) -> List[Dict]:
+        rule = self.quality_rules.get(self.quality)
+        if not rule:
+            return []
+        return select_formats(info.get('formats') or [], rule)
+    
+    def _finalize_outputs(self, tracker: OutputTracker) -> bool:
+        pair = tracker.unmerged_pair()
+        if pair:
+            video_file, audio_file = pair
+            base = output_base(video_file)
+            final_output = str(base.with_name(base.name + "_4K.mp4"))
             
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-            if result.returncode == 0:
-                codecs = result.stdout.strip().split('\n')
-                problematic_codecs = ['av01', 'vp9', 'opus', 'vorbis']
-                for codec in codecs:
-                    if any(prob in codec.lower() for prob in problematic_codecs):
-                        print(f"⚠️  Detected problematic codec: {codec}")
-                        return False
+            if self._merge_video_audio(video_file, audio_file, final_output):
+                print(f"🎉 Video downloaded and merged in maximum quality!")
+                tracker.output_file = final_output
                 return True
-            
-        except Exception:
-            pass
+            print(f"⚠️  Merge failed, keeping separate video and audio files")
+            return False
         
+        file_path = tracker.final_file()
+        if file_path and Path(file_path).suffix.lower() in VIDEO_EXTENSIONS:
+            print(f"🔍 Checking codec compatibility...")
+            plan = self.converter.conversion_plan(file_path)
+            if plan['action'] != PLAN_NONE:
+                base = output_base(file_path)
+                compatible_output = str(base.with_name(base.name + "_WMP_compatible.mp4"))
+                print(f"🧭 Conversion plan: {plan['action']}")
+                if self._convert_to_compatible_mp4(file_path, compatible_output, plan):
+                    print(f"🎉 Video converted to Windows-compatible format with audio!")
+                    tracker.output_file = compatible_output
+                    return True
+                print(f"⚠️  Conversion failed, keeping original file")
+                return False
+            else:
+                print(f"✅ Codecs are already compatible!")
+        
+        if not file_path:
+            print(f"⚠️  No downloaded file to publish")
+            return False
+        print(f"✅ Video downloaded successfully!")
+        tracker.output_file = file_path
+        return True
+    
+    def _already_downloaded(self, video_id: Optional[str]) -> bool:
+        entry = self.archive.lookup(video_id, self.quality)
+        if entry:
+            print(f"⏭️  Already downloaded ({self.quality}): {entry['path']}")
+            return True
         return False
     
-    def list_formats(self, url: str) -> bool:
-        try:
-            ydl_opts = {
-                'listformats': True,
-                'quiet': False,
-            }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.extract_info(url, download=False)
-                return True
-        except Exception as e:
-            print(f"✗ Error getting formats for {url}: {str(e)}")
-            return False
+    def _fetch(self, url: str, cancelled: Optional[threading.Event] = None) -> Optional[Dict]:
+        with self.metrics.span('fetch', url=url) as span:
+            job = self._fetch_with_retries(url, cancelled, span)
+            span.set(status='ok' if job is not None else 'failed')
+            return job
     
-    def download_video(self, url: str) -> bool:
-        try:
-            opts = self.get_ydl_opts()
+    def _fetch_with_retries(self, url: str, cancelled: Optional[threading.Event], span) -> Optional[Dict]:
+        attempt = 0
+        while True:
+            try:
+                return self._fetch_once(url, cancelled)
+            except Exception as e:
+                if cancelled and cancelled.is_set():
+                    print(f"🛑 Cancelled: {url}")
+                    span.set(status='cancelled')
+                    return None
+                category = classify_error(e)
+                if not self.retry_policy.should_retry(category, attempt):
+                    self.failures.record(category)
+                    self.metrics.count('failures', category=category)
+                    span.set(status='failed', category=category, retries=attempt)
+                    print(f"❌ Error downloading {url} ({category}): {str(e)}")
+                    return None
+                
+                delay = self.retry_policy.delay(attempt, category)
+                attempt += 1
+                self.failures.record_retry()
+                self.metrics.count('retries', category=category)
+                span.set(retries=attempt)
+                print(f"🔁 {category.capitalize()} error on {url}, retry {attempt}/{self.retry_policy.retries} "
+                      f"in {delay:.1f}s (partial downloads resume where they stopped)")
+                # Stream URLs in cached metadata may be what expired, so resolve the page again
+                video_id = extract_video_id(url)
+                if video_id:
+                    self.cache.invalidate(video_id)
+                # Waiting on the cancel event doubles as a sleep that a cancellation cuts short
+                if cancelled is None:
+                    time.sleep(delay)
+                elif cancelled.wait(delay):
+                    print(f"🛑 Cancelled: {url}")
+                    span.set(status='cancelled')
+                    return None
+    
+    def _fetch_once(self, url: str, cancelled: Optional[threading.Event] = None) -> Dict:
+        video_id = extract_video_id(url)
+        if self._already_downloaded(video_id):
+            return {'url': url, 'video_id': video_id, 'tracker': None}
+        
+        self.converter.ffmpeg_command()
+        tracker = OutputTracker(cancelled)
+        
+        with self.sessions.session('download', self.get_ydl_opts, tracker) as session:
+            ydl = session.ydl
+            ydl.take_errors()
+            print(f"⬇️ Downloading: {url}")
+            print(f"🎯 Quality setting: {self.quality}")
+            
+            info = self._extract_info(ydl, url)
+            if not info:
+                errors = ydl.take_errors()
+                raise DownloadFailure(errors[-1] if errors else f"Could not extract video information for {url}")
             
             if self.quality in ['best', 'ultra']:
                 print(f"🔍 Searching for highest quality format...")
-                try:
-                    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                        info = ydl.extract_info(url, download=False)
-                        formats = info.get('formats', [])
-                        if formats:
-                            best_height = max(f.get('height', 0) for f in formats if f.get('height'))
-                            print(f"📺 Best available quality: {best_height}p")
-                except:
-                    pass
+                self._report_best_height(info)
             
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                print(f"⬇️ Downloading: {url}")
-                print(f"🎯 Quality setting: {self.quality}")
-                
-                info = ydl.extract_info(url, download=False)
-                video_title = info.get('title', 'video').replace('/', '_').replace('\\', '_')
-                
-                ydl.download([url])
-                
-                video_files = list(self.output_dir.glob(f"{video_title}.f*.mp4"))
-                audio_files = list(self.output_dir.glob(f"{video_title}.f*.webm")) + list(self.output_dir.glob(f"{video_title}.f*.m4a"))
-                
-                if len(video_files) == 1 and len(audio_files) == 1:
-                    video_file = str(video_files[0])
-                    audio_file = str(audio_files[0])
-                    final_output = str(self.output_dir / f"{video_title}_4K.mp4")
-                    
-                    if self._merge_video_audio(video_file, audio_file, final_output):
-                        print(f"🎉 Video downloaded and merged in maximum quality!")
-                        return True
+            selection = self.select_formats(info)
+            if selection:
+                print(f"🎞️  Selected formats: {describe_selection(selection)}")
+            
+            if not video_id:
+                video_id = info.get('id')
+                if self._already_downloaded(video_id):
+                    return {'url': url, 'video_id': video_id, 'tracker': None}
+            
+            # Held until the job is published, so parallel jobs cannot all count on the same free space
+            reservation = self.scratch.reserve(
+                estimate_download_size(info, info.get('requested_formats') or selection))
+            try:
+                if self._streams_audio(selection):
+                    job = self._stream_audio(ydl, info, selection[0], url, video_id, cancelled)
                 else:
-                    existing_files = list(self.output_dir.glob(f"{video_title}.*"))
-                    if existing_files:
-                        converted = False
-                        for file_path in existing_files:
-                            if file_path.suffix.lower() in ['.mp4', '.mkv', '.webm', '.avi', '.mov']:
-                                print(f"🔍 Checking codec compatibility...")
-                                if not self._check_codec_compatibility(str(file_path)) or self.force_convert:
-                                    compatible_output = str(self.output_dir / f"{video_title}_WMP_compatible.mp4")
-                                    print(f"🔄 Converting AV1/Opus to H.264/AAC for Windows compatibility...")
-                                    if self._convert_to_compatible_mp4(str(file_path), compatible_output):
-                                        print(f"🎉 Video converted to Windows-compatible format with audio!")
-                                        converted = True
-                                        break
-                                    else:
-                                        print(f"⚠️  Conversion failed, keeping original file")
-                                else:
-                                    print(f"✅ Codecs are already compatible!")
-                        
-                        if not converted:
-                            print(f"✅ Video downloaded successfully!")
-                        else:
-                            return True
-                    
-                print(f"✅ Successfully downloaded video from: {url}")
+                    job = self._download_formats(ydl, info, selection, url, video_id, tracker)
+            except BaseException:
+                reservation.release()
+                raise
+            job['reservation'] = reservation
+            return job
+    
+    def _download_formats(self, ydl, info: Dict, selection: List[Dict], url: str, video_id: Optional[str],
+                          tracker: OutputTracker) -> Dict:
+        streams = self._separate_streams(info, selection)
+        if streams:
+            self._fetch_streams(ydl, info, streams)
+            return {'url': url, 'video_id': video_id, 'tracker': tracker}
+        
+        # Reuse the extracted (or cached) info dict instead of resolving the page again
+        with self.metrics.span('transfer', url=url, mode='yt-dlp') as span:
+            ydl.process_ie_result(info, download=True)
+            span.set(bytes=tracker.total_bytes)
+        
+        # ignoreerrors keeps yt-dlp from raising, so a failed download shows up as errors and no output
+        errors = ydl.take_errors()
+        if not tracker.final_file() and not tracker.unmerged_pair():
+            if errors:
+                raise DownloadFailure(errors[-1])
+            raise DownloadFailure(f"yt-dlp finished without producing a file for {url}", UNKNOWN)
+        return {'url': url, 'video_id': video_id, 'tracker': tracker}
+    
+    def _separate_streams(self, info: Dict, selection: List[Dict]) -> Optional[List[Dict]]:
+        if not self.parallel_streams:
+            return None
+        # Fresh metadata carries yt-dlp's own pick; cached metadata has it stripped, so use ours
+        streams = info.get('requested_formats') or selection
+        if len(streams) != 2 or not all(fmt.get('url') for fmt in streams):
+            return None
+        video = next((fmt for fmt in streams if fmt.get('vcodec') not in (None, 'none')), None)
+        audio = next((fmt for fmt in streams if fmt is not video), None)
+        if not video or audio.get('acodec') in (None, 'none'):
+            return None
+        return [video, audio]
+    
+    def _stream_path(self, ydl, info: Dict, fmt: Dict) -> str:
+        # Same "<title>.f<format_id>.<ext>" name yt-dlp gives separately downloaded streams
+        path = Path(ydl.prepare_filename({**info, 'ext': fmt['ext']}))
+        return str(path.with_name(f"{path.stem}.f{fmt['format_id']}.{fmt['ext']}"))
+    
+    def _fetch_streams(self, ydl, info: Dict, streams: List[Dict]) -> Dict[str, float]:
+        base_info = {k: v for k, v in info.items() if k not in ('formats', 'requested_formats', 'requested_downloads')}
+        
+        def fetch(kind: str, fmt: Dict) -> float:
+            path = self._stream_path(ydl, info, fmt)
+            with self.metrics.span('transfer', url=info.get('webpage_url'), stream=kind,
+                                   format_id=fmt.get('format_id')) as span:
+                started = time.perf_counter()
+                ydl.dl(path, {**base_info, **fmt})
+                elapsed = time.perf_counter() - started
+                if not os.path.exists(path):
+                    errors = ydl.take_errors()
+                    raise DownloadFailure(errors[-1] if errors else f"The {kind} stream did not download")
+                span.set(bytes=lambda: os.path.getsize(path))
+            return elapsed
+        
+        print(f"⏬ Fetching video and audio streams in parallel")
+        # Both transfers run at once; the merge starts in postprocessing as soon as the slower one lands
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='ydl-stream') as pool:
+            futures = {kind: pool.submit(fetch, kind, fmt) for kind, fmt in zip(('video', 'audio'), streams)}
+            timings = {kind: future.result() for kind, future in futures.items()}
+        wall = time.perf_counter() - started
+        
+        with self._timings_lock:
+            for kind, elapsed in timings.items():
+                self.stream_timings[kind] += elapsed
+        print(f"⏱️  Video stream: {timings['video']:.1f}s, audio stream: {timings['audio']:.1f}s, "
+              f"both done after {wall:.1f}s")
+        return timings
+    
+    def _streams_audio(self, selection: List[Dict]) -> bool:
+        rule = self.quality_rules.get(self.quality) or {}
+        return (self.stream_audio and rule.get('audio_only') and len(selection) == 1
+                and selection[0].get('protocol') in ('http', 'https') and bool(selection[0].get('url')))
+    
+    def _stream_audio(self, ydl, info: Dict, fmt: Dict, url: str, video_id: Optional[str],
+                      cancelled: Optional[threading.Event] = None) -> Dict:
+        from yt_dlp.networking import Request
+        
+        ffmpeg_cmd = self.converter.ffmpeg_command()
+        if not ffmpeg_cmd:
+            raise DownloadFailure("ffmpeg not available for audio streaming", POSTPROCESS)
+        
+        output_file = ydl.prepare_filename({**info, 'ext': self.audio_format})
+        print(f"🎧 Streaming {fmt.get('acodec') or 'audio'} straight into {self.audio_format}: {output_file}")
+        headers = fmt.get('http_headers') or {}
+        chunk_size = (fmt.get('downloader_options') or {}).get('http_chunk_size')
+        
+        def open_range(start: int, end: int):
+            return ydl.urlopen(Request(fmt['url'], headers={**headers, 'Range': f'bytes={start}-{end}'}))
+        
+        with self.metrics.span('stream_audio', url=url, format=self.audio_format) as span:
+            if chunk_size:
+                chunks = iter_ranges(open_range, chunk_size, fmt.get('filesize'))
+            else:
+                chunks = iter_response(ydl.urlopen(Request(fmt['url'], headers=headers)))
+            if cancelled:
+                chunks = until_cancelled(chunks, cancelled)
+            try:
+                success, error = stream_audio(ffmpeg_cmd, chunks, output_file, self.audio_format,
+                                              fmt.get('acodec'), info.get('duration'),
+                                              self.converter.progress_callback)
+            except Exception as e:
+                # A broken input stream is a network problem worth retrying
+                raise DownloadFailure(f"Audio stream broke off: {e}", NETWORK)
+            span.set(status='ok' if success else 'failed')
+            if success:
+                span.set(bytes=lambda: os.path.getsize(output_file))
+        if not success:
+            raise DownloadFailure(f"Audio streaming failed: {error}", POSTPROCESS)
+        
+        tracker = OutputTracker()
+        tracker.final_files.append(output_file)
+        return {'url': url, 'video_id': video_id, 'tracker': tracker}
+    
+    def _release(self, job: Dict):
+        reservation = job.get('reservation')
+        if reservation:
+            reservation.release()
+    
+    def _publish_outputs(self, tracker: OutputTracker):
+        # Everything was written in scratch; one rename per file makes the results appear complete
+        with self.metrics.span('publish') as span:
+            if tracker.output_file:
+                tracker.output_file = self.scratch.publish(tracker.output_file)
+                span.set(bytes=lambda: os.path.getsize(tracker.output_file))
+                return
+            # A failed merge keeps the separate streams, so hand those over instead
+            for path in dict.fromkeys(tracker.video_files + tracker.audio_files + tracker.final_files):
+                if os.path.exists(path):
+                    self.scratch.publish(path)
+    
+    def _postprocess(self, job: Dict) -> bool:
+        tracker = job['tracker']
+        if tracker is None:
+            return True
+        
+        with self.metrics.span('postprocess', url=job['url']) as span:
+            try:
+                finalized = self._finalize_outputs(tracker)
+                # What was downloaded is handed over either way; a failed merge or conversion is still a failure
+                self._publish_outputs(tracker)
+                if not finalized:
+                    self.failures.record(POSTPROCESS)
+                    self.metrics.count('failures', category=POSTPROCESS)
+                    span.set(status='failed')
+                    print(f"❌ Post-processing failed for {job['url']}")
+                    return False
+                self.archive.record(job['video_id'], self.quality, tracker.output_file)
+                
+                print(f"✅ Successfully downloaded video from: {job['url']}")
                 return True
-        except Exception as e:
-            print(f"❌ Error downloading {url}: {str(e)}")
+            except Exception as e:
+                self.failures.record(POSTPROCESS)
+                self.metrics.count('failures', category=POSTPROCESS)
+                span.set(status='failed', error=str(e))
+                print(f"❌ Error processing {job['url']}: {str(e)}")
+                return False
+            finally:
+                self._release(job)
+    
+    def download_video(self, url: str, cancelled: Optional[threading.Event] = None) -> bool:
+        job = self._fetch(url, cancelled)
+        if job is None:
+            return False
+        if cancelled and cancelled.is_set():
+            self._release(job)
             return False
+        return self._postprocess(job)
+    
+    def warm_up(self):
+        # Resolve ffmpeg and build a download session (and its extractors) before the first job needs them
+        self.converter.ffmpeg_command()
+        with self.sessions.session('download', self.get_ydl_opts):
+            pass
+    
+    def read_url_list(self, file_path: str) -> List[str]:
+        return read_url_list(file_path)
+    
+    def _expand_opts(self) -> Dict:
+        return {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist', 'ignoreerrors': True}
+    
+    def _expand_collection(self, url: str, depth: int = 0) -> Iterator[str]:
+        with self.sessions.session('expand', self._expand_opts) as session:
+            # process=False keeps the extractor's lazy entries: pages are fetched as we iterate
+            info = session.ydl.extract_info(url, download=False, process=False)
+            if not info:
+                print(f"❌ Could not list entries for {url}", file=sys.stderr)
+                return
+            if info.get('_type', 'video') == 'video':
+                yield info.get('webpage_url') or url
+                return
+            
+            # Batched --info writes records to stdout while collections are listed, so keep this out of it
+            print(f"📃 Expanding {info.get('title') or url}...", file=sys.stderr)
+            for entry in iter_entries(info.get('entries')):
+                if is_nested_collection(entry):
+                    nested = entry_url(entry)
+                    if nested and depth < self.MAX_EXPANSION_DEPTH:
+                        yield from self._expand_collection(nested, depth + 1)
+                    continue
+                video_url = entry_url(entry)
+                if video_url:
+                    yield video_url
+    
+    def expand_urls(self, urls: Iterable[str]) -> Iterator[str]:
+        for url in urls:
+            if extract_video_id(url) or not is_collection_url(url):
+                yield url
+                continue
+            try:
+                yield from self._expand_collection(url)
+            except Exception as e:
+                print(f"❌ Error expanding {url}: {str(e)}", file=sys.stderr)
+    
+    def download_urls(self, urls: Iterable[str], total: Optional[int] = None) -> Dict[str, int]:
+        if self.jobs > 1:
+            print(f"⚙️  Running {self.jobs} parallel jobs, up to {self.max_transcodes} ffmpeg transcodes at once")
+        
+        def fetch(item):
+            i, url = item
+            position = f"{i}/{total}" if total else str(i)
+            print(f"\n[{position}] Processing: {url}")
+            return self._fetch(url)
+        
+        # Collections are expanded lazily, so downloads start while later pages are still being listed.
+        # Fetching the next video overlaps with merging/converting the previous ones.
+        pipeline = FetchPostprocessPipeline(self.jobs, self.max_transcodes)
+        stats = pipeline.run(enumerate(self.expand_urls(urls), 1), fetch, self._postprocess)
+        stats['rate_limit'] = self.rate_limiter.stats()
+        stats['failures'] = self.failures.snapshot()
+        stats['retries'] = self.failures.retries
+        with self._timings_lock:
+            if any(self.stream_timings.values()):
+                stats['timings']['streams'] = dict(self.stream_timings)
+        return stats
     
     def download_from_list(self, file_path: str) -> Dict[str, int]:
         stats = {'successful': 0, 'failed': 0, 'total': 0}
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-            
-            stats['total'] = len(urls)
-            print(f"Found {stats['total']} URLs in {file_path}")
+            urls = self.read_url_list(file_path)
             
-            for i, url in enumerate(urls, 1):
-                print(f"\n[{i}/{stats['total']}] Processing: {url}")
-                
-                if self.download_video(url):
-                    stats['successful'] += 1
-                else:
-                    stats['failed'] += 1
+            print(f"Found {len(urls)} URLs in {file_path}")
+            has_collections = any(is_collection_url(url) and not extract_video_id(url) for url in urls)
+            stats = self.download_urls(urls, None if has_collections else len(urls))
                     
         except FileNotFoundError:
             print(f"✗ Error: File '{file_path}' not found")
@@ -365,16 +572,39 @@ class YouTubeDownloader:
         
         return stats
     
+    def _info_opts(self) -> Dict:
+        return {'quiet': True, 'no_warnings': True}
+    
+    def _summarize_info(self, info: Dict) -> Dict:
+        return {
+            'id': info.get('id'),
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            'view_count': info.get('view_count', 0),
+            'upload_date': info.get('upload_date'),
+        }
+    
     def get_video_info(self, url: str) -> Optional[Dict]:
         try:
-            ydl_opts = {'quiet': True, 'no_warnings': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    'title': info.get('title', 'Unknown'),
-                    'duration': info.get('duration', 0),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'view_count': info.get('view_count', 0)
-                }
+            with self.sessions.session('info', self._info_opts) as session:
+                info = self._extract_info(session.ydl, url, announce=False)
+                if not info:
+                    return None
+                return self._summarize_info(info)
         except Exception:
-            return None
\ No newline at end of file
+            return None
+    
+    def iter_video_info(self, urls: Iterable[str], concurrency: Optional[int] = None) -> Iterator[Dict]:
+        def resolve(url):
+            try:
+                with self.sessions.session('info', self._info_opts) as session:
+                    info = self._extract_info(session.ydl, url, announce=False)
+            except Exception as e:
+                return {'url': url, 'error': str(e)}
+            if not info:
+                return {'url': url, 'error': 'No metadata returned'}
+            return {'url': url, **self._summarize_info(info), 'error': None}
+        
+        for _, record in BatchScheduler(concurrency or self.jobs).stream(urls, resolve):
+            yield record
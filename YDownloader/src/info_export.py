@@ -0,0 +1,34 @@
+import csv
+import json
+from typing import Dict, Iterable, TextIO
+
+
+INFO_FIELDS = ['url', 'id', 'title', 'uploader', 'duration', 'view_count', 'upload_date', 'error']
+INFO_FORMATS = ['jsonl', 'csv']
+
+
+def write_info_records(records: Iterable[Dict], stream: TextIO, output_format: str = 'jsonl') -> Dict[str, int]:
+    stats = {'successful': 0, 'failed': 0, 'total': 0}
+
+    writer = None
+    if output_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=INFO_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+    elif output_format != 'jsonl':
+        raise ValueError(f"Unknown info format: {output_format}")
+
+    for record in records:
+        if writer:
+            writer.writerow(record)
+        else:
+            stream.write(json.dumps({field: record.get(field) for field in INFO_FIELDS}, ensure_ascii=False) + '\n')
+        # Flush per record so consumers see results as soon as each URL resolves
+        stream.flush()
+
+        stats['total'] += 1
+        if record.get('error'):
+            stats['failed'] += 1
+        else:
+            stats['successful'] += 1
+
+    return stats
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional
+
+
+MP4_COPY_VIDEO_CODECS = ['h264']
+MP4_COPY_AUDIO_CODECS = ['aac', 'mp3']
+
+PLAN_NONE = 'none'
+PLAN_REMUX = 'remux'
+PLAN_AUDIO = 'audio'
+PLAN_FULL = 'full'
+
+AUDIO_ARGS = ['-c:a', 'aac', '-ac', '2', '-ar', '48000', '-ab', '192k']
+
+TRANSCODE_PROFILES = {
+    'merge': {
+        'video': ['-c:v', 'libx264', '-preset', 'fast', '-crf', '23'],
+        'audio': AUDIO_ARGS,
+    },
+    'compatible': {
+        'video': ['-c:v', 'libx264', '-profile:v', 'main', '-level', '3.1', '-preset', 'fast', '-crf', '23', '-pix_fmt', 'yuv420p'],
+        'audio': AUDIO_ARGS,
+    },
+    'fast': {
+        'video': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '24', '-pix_fmt', 'yuv420p'],
+        'audio': AUDIO_ARGS,
+    },
+    'quality': {
+        'video': ['-c:v', 'libx264', '-profile:v', 'high', '-preset', 'slow', '-crf', '19', '-pix_fmt', 'yuv420p'],
+        'audio': ['-c:a', 'aac', '-ac', '2', '-ar', '48000', '-ab', '256k'],
+    },
+}
+
+# Formats ffmpeg can write straight from a streamed audio download
+STREAM_AUDIO_FORMATS = ['mp3', 'm4a']
+
+
+def plan_conversion(video_codec: Optional[str], audio_codec: Optional[str], container: str = 'mp4',
+                    force: bool = False) -> Dict[str, Optional[str]]:
+    if force:
+        video, audio = 'transcode', 'transcode'
+    else:
+        video = 'copy' if video_codec in MP4_COPY_VIDEO_CODECS else 'transcode'
+        audio = 'copy' if audio_codec in MP4_COPY_AUDIO_CODECS else 'transcode'
+
+    if video_codec is None and not force:
+        video = None
+    if audio_codec is None and not force:
+        audio = None
+
+    if video == 'transcode':
+        action = PLAN_FULL
+    elif audio == 'transcode':
+        action = PLAN_AUDIO
+    elif container.lower().lstrip('.') != 'mp4':
+        action = PLAN_REMUX
+    else:
+        action = PLAN_NONE
+
+    return {'action': action, 'video': video, 'audio': audio}
+
+
+def codec_args(plan: Dict[str, Optional[str]], profile: str = 'merge') -> List[str]:
+    settings = TRANSCODE_PROFILES[profile]
+    args = []
+    if plan.get('video') == 'transcode':
+        args += settings['video']
+    elif plan.get('video') == 'copy':
+        args += ['-c:v', 'copy']
+    if plan.get('audio') == 'transcode':
+        args += settings['audio']
+    elif plan.get('audio') == 'copy':
+        args += ['-c:a', 'copy']
+    return args
+
+
+def describe_plan(plan: Dict[str, Optional[str]], video_codec: Optional[str], audio_codec: Optional[str]) -> str:
+    steps = []
+    if plan.get('video') == 'copy':
+        steps.append(f"copy {video_codec} video")
+    elif plan.get('video') == 'transcode':
+        steps.append(f"transcode {video_codec or 'unknown'} video to h264")
+    if plan.get('audio') == 'copy':
+        steps.append(f"copy {audio_codec} audio")
+    elif plan.get('audio') == 'transcode':
+        steps.append(f"transcode {audio_codec or 'unknown'} audio to aac")
+    return f"{plan['action']} ({', '.join(steps) or 'no streams'})"
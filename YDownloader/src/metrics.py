@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+PREFIX = 'ydownloader'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _NullSpan:
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# Handed out by a disabled Metrics: no clock reads, no allocations, nothing recorded
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+
+    def __init__(self, metrics: 'Metrics', name: str, attrs: Dict):
+        self.metrics = metrics
+        self.name = name
+        self.attrs = attrs
+        self.started = 0.0
+        self.start_time = 0.0
+
+    def set(self, **attrs):
+        # Costly values (file sizes) come as callables so a disabled Metrics never computes them
+        self.attrs.update({key: value() if callable(value) else value for key, value in attrs.items()})
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        if exc_type is not None and 'status' not in self.attrs:
+            self.attrs['status'] = 'error'
+            self.attrs['error'] = str(exc) or exc_type.__name__
+        self.metrics._finish(self, duration)
+        return False
+
+
+class Metrics:
+
+    def __init__(self, trace_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.prometheus_path = prometheus_path
+        self.enabled = bool(trace_path or prometheus_path)
+        self._trace = open(trace_path, 'a', encoding='utf-8') if trace_path else None
+        self._durations: Dict[Tuple[str, str], list] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _finish(self, span: Span, duration: float):
+        status = span.attrs.get('status', 'ok')
+        nbytes = span.attrs.get('bytes')
+        record = {'span': span.name, 'start': round(span.start_time, 6), 'duration_s': round(duration, 6),
+                  'thread': threading.current_thread().name, **span.attrs}
+        if nbytes and duration > 0:
+            record['throughput_bps'] = round(nbytes / duration)
+
+        with self._lock:
+            stats = self._durations.setdefault((span.name, status), [0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            if nbytes:
+                key = ('stage_bytes', (('stage', span.name),))
+                self._counters[key] = self._counters.get(key, 0) + nbytes
+            if self._trace:
+                self._trace.write(json.dumps(record, default=str) + '\n')
+                self._trace.flush()
+
+    def prometheus_text(self) -> str:
+        lines = [
+            f'# HELP {PREFIX}_stage_duration_seconds Time spent per download stage',
+            f'# TYPE {PREFIX}_stage_duration_seconds summary',
+        ]
+        with self._lock:
+            durations = sorted(self._durations.items())
+            counters = sorted(self._counters.items())
+        for (stage, status), (count, total) in durations:
+            labels = f'stage="{stage}",status="{status}"'
+            lines.append(f'{PREFIX}_stage_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_count{{{labels}}} {count}')
+
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f'{PREFIX}_{name}_total'
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            rendered = ','.join(f'{label}="{_escape(text)}"' for label, text in labels)
+            lines.append(f'{metric}{{{rendered}}} {value:g}' if rendered else f'{metric} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        if not self.prometheus_path:
+            return
+        # Written next to the target and renamed over it, so a scraper never reads half a file
+        tmp_path = self.prometheus_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.prometheus_path)
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.write_prometheus()
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+                self._trace = None
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,76 @@
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .scheduler import BatchScheduler
+
+_DONE = object()
+
+
+class FetchPostprocessPipeline:
+
+    def __init__(self, fetch_jobs: int = 1, postprocess_jobs: int = 1, queue_size: Optional[int] = None):
+        self.fetch_jobs = max(1, fetch_jobs)
+        self.postprocess_jobs = max(1, postprocess_jobs)
+        # Downloaded-but-unprocessed files waiting on disk; fetching pauses once this many pile up
+        self.queue_size = max(1, queue_size or self.postprocess_jobs)
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Any], fetch: Callable[[Any], Any],
+            postprocess: Callable[[Any], bool]) -> Dict:
+        stats = {'successful': 0, 'failed': 0, 'total': 0}
+        timings = {'fetch': 0.0, 'postprocess': 0.0}
+        handoff: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        def timed(stage: str, func: Callable[[Any], Any], arg: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(arg)
+            finally:
+                with self._lock:
+                    timings[stage] += time.perf_counter() - started
+
+        def record(success: bool):
+            with self._lock:
+                stats['total'] += 1
+                if success:
+                    stats['successful'] += 1
+                else:
+                    stats['failed'] += 1
+
+        def consume():
+            while True:
+                job = handoff.get()
+                if job is _DONE:
+                    return
+                try:
+                    success = bool(timed('postprocess', postprocess, job))
+                except Exception as e:
+                    print(f"❌ Job failed: {e}", file=sys.stderr)
+                    success = False
+                record(success)
+
+        consumers = [threading.Thread(target=consume, name=f'ydl-postprocess-{i}', daemon=True)
+                     for i in range(self.postprocess_jobs)]
+        for consumer in consumers:
+            consumer.start()
+
+        started = time.perf_counter()
+        try:
+            scheduler = BatchScheduler(self.fetch_jobs)
+            for _, job in scheduler.stream(items, lambda item: timed('fetch', fetch, item)):
+                if job is None:
+                    record(False)
+                    continue
+                # Blocks while postprocessing is behind, which in turn stops new fetches from starting
+                handoff.put(job)
+        finally:
+            for _ in consumers:
+                handoff.put(_DONE)
+            for consumer in consumers:
+                consumer.join()
+
+        stats['timings'] = {**timings, 'wall': time.perf_counter() - started}
+        return stats
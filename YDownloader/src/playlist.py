@@ -0,0 +1,37 @@
+from typing import Any, Dict, Iterator, Optional
+
+from .utils import extract_video_id
+
+PAGE_SIZE = 50
+
+
+def iter_entries(entries: Any, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+    if entries is None:
+        return
+    if hasattr(entries, 'getslice'):
+        # PagedList: pull one slice at a time so only the pages we reach are fetched
+        start = 0
+        while True:
+            page = entries.getslice(start, start + page_size)
+            yield from (entry for entry in page if entry)
+            if len(page) < page_size:
+                return
+            start += page_size
+    else:
+        # Lists, LazyLists and the generators yt-dlp's tab extractors return
+        yield from (entry for entry in entries if entry)
+
+
+def entry_url(entry: Dict) -> Optional[str]:
+    video_id = entry.get('id')
+    if entry.get('ie_key') == 'Youtube' and video_id:
+        return f"https://www.youtube.com/watch?v={video_id}"
+    return entry.get('webpage_url') or entry.get('url')
+
+
+def is_nested_collection(entry: Dict) -> bool:
+    if entry.get('_type') == 'playlist':
+        return True
+    url = entry_url(entry)
+    # Channel roots list their tabs (Videos, Shorts, Live) as further flat entries
+    return entry.get('ie_key') == 'YoutubeTab' and not (url and extract_video_id(url))
@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import Metrics
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def summarize_probe(probe: Dict) -> Dict:
+    streams: List[Dict] = probe.get('streams') or []
+    fmt: Dict = probe.get('format') or {}
+    media = {
+        'codecs': [(stream.get('codec_name') or '').lower() for stream in streams if stream.get('codec_name')],
+        'streams': streams,
+        'format': fmt,
+    }
+
+    for stream in streams:
+        codec_type = stream.get('codec_type')
+        if codec_type not in ('video', 'audio') or codec_type in media:
+            continue
+        media[codec_type] = (stream.get('codec_name') or '').lower()
+        media[f'{codec_type}_bit_rate'] = _to_int(stream.get('bit_rate'))
+        if codec_type == 'video':
+            media['width'] = stream.get('width')
+            media['height'] = stream.get('height')
+
+    duration = _to_float(fmt.get('duration'))
+    if duration is not None:
+        media['duration'] = duration
+    bit_rate = _to_int(fmt.get('bit_rate'))
+    if bit_rate is not None:
+        media['bit_rate'] = bit_rate
+    return media
+
+
+class ProbeService:
+
+    MAX_ENTRIES = 256
+
+    def __init__(self, ffprobe_command: Callable[[], Optional[str]], max_entries: int = MAX_ENTRIES,
+                 metrics: Optional[Metrics] = None):
+        self.ffprobe_command = ffprobe_command
+        self.metrics = metrics or Metrics()
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, int, int], Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, file_path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        # A file rewritten in place (remux, resumed download) gets a new size or mtime, so a new probe
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+    def probe(self, file_path: str) -> Dict:
+        key = self._key(file_path)
+        if key is None:
+            return {}
+
+        with self._lock:
+            media = self._entries.get(key)
+            if media is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.metrics.count('probe_cache', result='hit')
+                return media
+            self.misses += 1
+        self.metrics.count('probe_cache', result='miss')
+
+        with self.metrics.span('probe', file=os.path.basename(file_path)) as span:
+            media = self._run_ffprobe(file_path)
+            span.set(status='ok' if media else 'failed')
+        if media:
+            with self._lock:
+                self._entries[key] = media
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return media
+
+    def _run_ffprobe(self, file_path: str) -> Dict:
+        ffprobe_cmd = self.ffprobe_command()
+        if not ffprobe_cmd:
+            return {}
+
+        try:
+            cmd = [
+                ffprobe_cmd,
+                '-v', 'quiet',
+                '-show_streams',
+                '-show_format',
+                '-of', 'json',
+                file_path
+            ]
+
+            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+            if result.returncode != 0:
+                return {}
+            return summarize_probe(json.loads(result.stdout))
+        except Exception:
+            return {}
+
+    def invalidate(self, file_path: Optional[str] = None):
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(file_path)
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
@@ -0,0 +1,173 @@
+import io
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+ProgressCallback = Callable[[Dict], None]
+
+STDERR_TAIL_LINES = 40
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    try:
+        return float(value.rstrip('x'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def progress_snapshot(fields: Dict[str, str], duration: Optional[float]) -> Dict:
+    out_time = None
+    for key in ('out_time_us', 'out_time_ms'):
+        # ffmpeg reports microseconds under both keys
+        try:
+            out_time = int(fields[key]) / 1_000_000
+            break
+        except (KeyError, ValueError):
+            continue
+
+    try:
+        fps = float(fields.get('fps', ''))
+    except ValueError:
+        fps = None
+    speed = _parse_speed(fields.get('speed', ''))
+
+    percent = None
+    eta = None
+    if duration and out_time is not None:
+        percent = max(0.0, min(100.0, out_time / duration * 100))
+        if speed:
+            eta = max(0.0, (duration - out_time) / speed)
+
+    return {
+        'out_time': out_time,
+        'percent': percent,
+        'fps': fps,
+        'speed': speed,
+        'eta': eta,
+        'done': fields.get('progress') == 'end',
+    }
+
+
+def run_ffmpeg(cmd: List[str], duration: Optional[float] = None, on_progress: Optional[ProgressCallback] = None,
+               timeout: Optional[float] = None, stdin_chunks: Optional[Iterable[bytes]] = None) -> Tuple[bool, str]:
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+
+    # Binary pipes so stdin can carry media bytes; the progress and log streams are decoded below
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE if stdin_chunks is not None else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout = io.TextIOWrapper(process.stdout, encoding='utf-8', errors='ignore')
+    stderr = io.TextIOWrapper(process.stderr, encoding='utf-8', errors='ignore')
+
+    def drain_stderr():
+        for line in stderr:
+            stderr_tail.append(line)
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    feed_error = []
+
+    def feed_stdin():
+        try:
+            for chunk in stdin_chunks:
+                try:
+                    process.stdin.write(chunk)
+                except OSError:
+                    # ffmpeg exited early; its own error ends up in the stderr tail
+                    return
+        except Exception as e:
+            # The input broke off: kill ffmpeg before it sees end of input and finalizes a truncated file
+            feed_error.append(e)
+            process.kill()
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = None
+    if stdin_chunks is not None:
+        feeder = threading.Thread(target=feed_stdin, daemon=True)
+        feeder.start()
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(timeout, kill) if timeout else None
+    if watchdog:
+        watchdog.daemon = True
+        watchdog.start()
+
+    try:
+        fields = {}
+        for line in stdout:
+            key, _, value = line.strip().partition('=')
+            if not key:
+                continue
+            fields[key] = value.strip()
+            if key == 'progress':
+                if on_progress:
+                    on_progress(progress_snapshot(fields, duration))
+                fields = {}
+        process.wait()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_thread.join(timeout=5)
+        if feeder:
+            feeder.join(timeout=5)
+
+    if timed_out.is_set():
+        return False, "Conversion timeout - file too large"
+    if feed_error:
+        raise feed_error[0]
+    return process.returncode == 0, ''.join(stderr_tail)
+
+
+class TqdmProgressReporter:
+
+    def __init__(self):
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict):
+        from tqdm import tqdm
+
+        task = event.get('task', 'ffmpeg')
+        with self._lock:
+            bar = self._bars.get(task)
+            if event.get('status') == 'start':
+                if bar is None:
+                    self._bars[task] = tqdm(total=100, desc=task, unit='%', position=len(self._bars),
+                                            bar_format='{desc}: {percentage:3.0f}%|{bar}| {postfix}', leave=True)
+                return
+            if bar is None:
+                return
+
+            if event.get('status') == 'end':
+                if event.get('success'):
+                    bar.n = 100
+                bar.close()
+                del self._bars[task]
+                return
+
+            if event.get('percent') is not None:
+                bar.n = round(event['percent'], 1)
+            postfix = []
+            if event.get('fps'):
+                postfix.append(f"{event['fps']:.0f} fps")
+            if event.get('speed'):
+                postfix.append(f"{event['speed']:.2f}x")
+            if event.get('eta') is not None:
+                postfix.append(f"ETA {int(event['eta'])}s")
+            bar.set_postfix_str(', '.join(postfix), refresh=False)
+            bar.refresh()
@@ -0,0 +1,212 @@
+import functools
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Each rule describes what a quality setting may download. Keys:
+#   min_height / max_height   bounds on the video stream height
+#   tiers                     list of height bounds tried in order (e.g. 2160p, then 1440p)
+#   vcodecs                   allowed video codec prefixes, e.g. ["avc1"] for H.264 only
+#   exclude_vcodecs / exclude_acodecs   codec substrings to skip
+#   max_tbr                   maximum video bitrate in kbps (formats without a known bitrate pass)
+#   prefer_ext                try this container first, then any, for the separate video stream
+#   fallback                  "muxed": a single file within the bounds, "any": anything at all, "none"
+#   fallback_ext              container tried first for the "muxed" fallback
+#   audio_only / audio_exts   audio-only download, trying these extensions in order
+#   worst                     smallest file instead of the best one
+QUALITY_RULES: Dict[str, Dict] = {
+    'best': {'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'], 'prefer_ext': 'mp4', 'fallback': 'muxed',
+             'fallback_ext': 'mp4'},
+    'ultra': {'tiers': [{'min_height': 2160}, {'min_height': 1440}], 'exclude_vcodecs': ['av01'],
+              'exclude_acodecs': ['opus'], 'fallback': 'any'},
+    '4k': {'min_height': 2160, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'], 'prefer_ext': 'mp4',
+           'fallback': 'muxed'},
+    '1440p': {'min_height': 1440, 'max_height': 2160, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'],
+              'prefer_ext': 'mp4', 'fallback': 'muxed'},
+    '1080p': {'min_height': 1080, 'max_height': 1440, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'],
+              'prefer_ext': 'mp4', 'fallback': 'muxed'},
+    '720p': {'min_height': 720, 'max_height': 1080, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'],
+             'prefer_ext': 'mp4', 'fallback': 'muxed'},
+    '480p': {'min_height': 480, 'max_height': 720, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'],
+             'prefer_ext': 'mp4', 'fallback': 'muxed'},
+    '360p': {'min_height': 360, 'max_height': 480, 'exclude_vcodecs': ['av01'], 'exclude_acodecs': ['opus'],
+             'prefer_ext': 'mp4', 'fallback': 'muxed'},
+    'worst': {'worst': True, 'prefer_ext': 'mp4'},
+    'audio': {'audio_only': True, 'audio_exts': ['m4a', 'mp3']},
+}
+
+RULE_KEYS = {
+    'min_height', 'max_height', 'tiers', 'vcodecs', 'exclude_vcodecs', 'exclude_acodecs', 'max_tbr',
+    'prefer_ext', 'fallback', 'fallback_ext', 'audio_only', 'audio_exts', 'worst',
+}
+FALLBACKS = ['muxed', 'any', 'none']
+
+# (kind, video filters, audio filters); kind is "merge", "single" or "audio"
+Alternative = Tuple[str, Dict, Dict]
+
+
+def validate_rule(name: str, rule: Dict):
+    if not isinstance(rule, dict):
+        raise ValueError(f"Quality profile '{name}' must be an object")
+    unknown = set(rule) - RULE_KEYS
+    if unknown:
+        raise ValueError(f"Quality profile '{name}' has unknown keys: {', '.join(sorted(unknown))}")
+    if rule.get('fallback', 'none') not in FALLBACKS:
+        raise ValueError(f"Quality profile '{name}' fallback must be one of: {', '.join(FALLBACKS)}")
+
+
+def load_quality_rules(path: str) -> Dict[str, Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, dict):
+        raise ValueError(f"{path} must contain an object mapping profile names to rules")
+    for name, rule in rules.items():
+        validate_rule(name, rule)
+    return rules
+
+
+def _freeze(rule: Dict) -> str:
+    return json.dumps(rule, sort_keys=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _alternatives(frozen_rule: str) -> Tuple[Alternative, ...]:
+    rule = json.loads(frozen_rule)
+
+    if rule.get('audio_only'):
+        alternatives = [('audio', {}, {'ext': ext}) for ext in rule.get('audio_exts', [])]
+        return tuple(alternatives + [('audio', {}, {})])
+
+    if rule.get('worst'):
+        ext = rule.get('prefer_ext')
+        return tuple(([('single', {'ext': ext}, {})] if ext else []) + [('single', {}, {})])
+
+    audio = {'exclude_codecs': rule.get('exclude_acodecs', [])}
+    video = {
+        'exclude_codecs': rule.get('exclude_vcodecs', []),
+        'max_tbr': rule.get('max_tbr'),
+    }
+    tiers = rule.get('tiers') or [{'min_height': rule.get('min_height'), 'max_height': rule.get('max_height')}]
+    codecs = rule.get('vcodecs') or [None]
+    exts = [rule['prefer_ext'], None] if rule.get('prefer_ext') else [None]
+
+    alternatives: List[Alternative] = []
+    for tier in tiers:
+        bounds = {'min_height': tier.get('min_height'), 'max_height': tier.get('max_height')}
+        for ext in exts:
+            for codec in codecs:
+                alternatives.append(('merge', {**video, **bounds, 'codec': codec, 'ext': ext}, audio))
+
+    fallback = rule.get('fallback', 'none')
+    if fallback == 'muxed':
+        bounds = {'min_height': tiers[0].get('min_height'), 'max_height': tiers[0].get('max_height')}
+        for ext in ([rule['fallback_ext'], None] if rule.get('fallback_ext') else [None]):
+            alternatives.append(('single', {**bounds, 'ext': ext}, {}))
+    elif fallback == 'any':
+        alternatives.append(('merge', {}, {}))
+        alternatives.append(('single', {}, {}))
+    return tuple(alternatives)
+
+
+def _spec_filters(filters: Dict, codec_field: str) -> str:
+    parts = []
+    if filters.get('min_height'):
+        parts.append(f"[height>={filters['min_height']}]")
+    if filters.get('max_height'):
+        parts.append(f"[height<={filters['max_height']}]")
+    if filters.get('codec'):
+        parts.append(f"[{codec_field}^={filters['codec']}]")
+    for codec in filters.get('exclude_codecs') or []:
+        parts.append(f"[{codec_field}!*={codec}]")
+    if filters.get('max_tbr'):
+        # Formats that do not report a bitrate are not ruled out by it
+        parts.append(f"[tbr<=?{filters['max_tbr']}]")
+    if filters.get('ext'):
+        parts.append(f"[ext={filters['ext']}]")
+    return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _format_spec(frozen_rule: str) -> str:
+    rule = json.loads(frozen_rule)
+    selector = 'worst' if rule.get('worst') else 'best'
+    specs = []
+    for kind, video, audio in _alternatives(frozen_rule):
+        if kind == 'audio':
+            specs.append(f"bestaudio{_spec_filters(audio, 'acodec')}")
+        elif kind == 'single':
+            specs.append(f"{selector}{_spec_filters(video, 'vcodec')}")
+        else:
+            specs.append(f"bestvideo{_spec_filters(video, 'vcodec')}+bestaudio{_spec_filters(audio, 'acodec')}")
+    return '/'.join(dict.fromkeys(specs))
+
+
+def format_spec(rule: Dict) -> str:
+    return _format_spec(_freeze(rule))
+
+
+def _matches(fmt: Dict, filters: Dict, codec_field: str) -> bool:
+    height = fmt.get('height')
+    if filters.get('min_height') and not (height and height >= filters['min_height']):
+        return False
+    if filters.get('max_height') and not (height and height <= filters['max_height']):
+        return False
+    codec = (fmt.get(codec_field) or '').lower()
+    if filters.get('codec') and not codec.startswith(filters['codec']):
+        return False
+    if any(excluded in codec for excluded in filters.get('exclude_codecs') or []):
+        return False
+    if filters.get('max_tbr') and fmt.get('tbr') and fmt['tbr'] > filters['max_tbr']:
+        return False
+    if filters.get('ext') and fmt.get('ext') != filters['ext']:
+        return False
+    return True
+
+
+def _has(fmt: Dict, field: str) -> bool:
+    return fmt.get(field) not in (None, 'none')
+
+
+def _pick(formats: List[Dict], predicate: Callable[[Dict], bool], worst: bool = False) -> Optional[Dict]:
+    # yt-dlp hands formats over sorted worst-to-best, the same order its own selectors rely on
+    candidates = [fmt for fmt in formats if predicate(fmt)]
+    if not candidates:
+        return None
+    return candidates[0] if worst else candidates[-1]
+
+
+def select_formats(formats: List[Dict], rule: Dict) -> List[Dict]:
+    worst = bool(rule.get('worst'))
+    for kind, video, audio in _alternatives(_freeze(rule)):
+        if kind == 'audio':
+            chosen = _pick(formats, lambda f: _has(f, 'acodec') and not _has(f, 'vcodec')
+                           and _matches(f, audio, 'acodec'))
+            if chosen:
+                return [chosen]
+        elif kind == 'single':
+            chosen = _pick(formats, lambda f: _has(f, 'vcodec') and _has(f, 'acodec')
+                           and _matches(f, video, 'vcodec'), worst)
+            if chosen:
+                return [chosen]
+        else:
+            video_format = _pick(formats, lambda f: _has(f, 'vcodec') and not _has(f, 'acodec')
+                                 and _matches(f, video, 'vcodec'))
+            audio_format = _pick(formats, lambda f: _has(f, 'acodec') and not _has(f, 'vcodec')
+                                 and _matches(f, audio, 'acodec'))
+            if video_format and audio_format:
+                return [video_format, audio_format]
+    return []
+
+
+def describe_selection(selection: List[Dict]) -> str:
+    parts = []
+    for fmt in selection:
+        details = [fmt.get('format_id') or '?']
+        if fmt.get('height'):
+            details.append(f"{fmt['height']}p")
+        codec = fmt.get('vcodec') if _has(fmt, 'vcodec') else fmt.get('acodec')
+        if codec:
+            details.append(codec)
+        if fmt.get('tbr'):
+            details.append(f"{fmt['tbr']:.0f}k")
+        parts.append(' '.join(details))
+    return ' + '.join(parts)
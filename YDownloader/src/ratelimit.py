@@ -0,0 +1,146 @@
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+THROTTLE_STATUSES = (403, 429)
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Going into debt lets a single read larger than the burst through, paid for by later callers
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+
+    BACKOFF_START = 2.0
+    BACKOFF_MAX = 300.0
+
+    def __init__(self, bytes_per_second: Optional[float] = None, requests_per_second: Optional[float] = None,
+                 host_bytes_per_second: Optional[float] = None, host_requests_per_second: Optional[float] = None):
+        self.host_bytes_per_second = host_bytes_per_second
+        self.host_requests_per_second = host_requests_per_second
+        self._global_bytes = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self._global_requests = TokenBucket(requests_per_second) if requests_per_second else None
+        self._hosts: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._backoff: Dict[str, float] = {}
+        self._penalty_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.throttle_events = 0
+        self.waited = 0.0
+
+    @property
+    def limits_bandwidth(self) -> bool:
+        return bool(self._global_bytes or self.host_bytes_per_second)
+
+    def _host(self, url: str) -> str:
+        return urlparse(url).hostname or ''
+
+    def _host_buckets(self, host: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        with self._lock:
+            buckets = self._hosts.get(host)
+            if buckets is None:
+                buckets = (
+                    TokenBucket(self.host_bytes_per_second) if self.host_bytes_per_second else None,
+                    TokenBucket(self.host_requests_per_second) if self.host_requests_per_second else None,
+                )
+                self._hosts[host] = buckets
+            return buckets
+
+    def _sleep(self, delay: float):
+        if delay > 0:
+            with self._lock:
+                self.waited += delay
+            time.sleep(delay)
+
+    def before_request(self, url: str):
+        host = self._host(url)
+        _, host_requests = self._host_buckets(host)
+        delay = max(
+            self._global_requests.reserve(1) if self._global_requests else 0.0,
+            host_requests.reserve(1) if host_requests else 0.0,
+        )
+        with self._lock:
+            delay = max(delay, self._penalty_until.get(host, 0.0) - time.monotonic())
+        self._sleep(delay)
+
+    def consume(self, url: str, nbytes: int):
+        if not nbytes:
+            return
+        host_bytes, _ = self._host_buckets(self._host(url))
+        self._sleep(max(
+            self._global_bytes.reserve(nbytes) if self._global_bytes else 0.0,
+            host_bytes.reserve(nbytes) if host_bytes else 0.0,
+        ))
+
+    def throttled(self, url: str, status: int, retry_after: Optional[float] = None):
+        host = self._host(url)
+        with self._lock:
+            backoff = min(self.BACKOFF_MAX, self._backoff.get(host, self.BACKOFF_START / 2) * 2)
+            if retry_after:
+                backoff = max(backoff, min(retry_after, self.BACKOFF_MAX))
+            self._backoff[host] = backoff
+            self._penalty_until[host] = max(self._penalty_until.get(host, 0.0), time.monotonic() + backoff)
+            self.throttle_events += 1
+        # Most likely on big --info runs, whose records go to stdout
+        print(f"🐢 {host} answered HTTP {status}, slowing requests to it for {backoff:.0f}s", file=sys.stderr)
+
+    def succeeded(self, url: str):
+        host = self._host(url)
+        with self._lock:
+            backoff = self._backoff.get(host)
+            if backoff is None:
+                return
+            # Ease off the penalty gradually so one good response does not invite another burst
+            if backoff / 2 < self.BACKOFF_START:
+                del self._backoff[host]
+            else:
+                self._backoff[host] = backoff / 2
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {'throttle_events': self.throttle_events, 'waited': self.waited}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ThrottledResponse:
+
+    def __init__(self, response, limiter: RateLimiter, url: str):
+        self._response = response
+        self._limiter = limiter
+        self._url = url
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read() if amt is None else self._response.read(amt)
+        self._limiter.consume(self._url, len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._response.close()
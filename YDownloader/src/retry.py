@@ -0,0 +1,135 @@
+import errno
+import random
+import socket
+import sys
+import threading
+from typing import Dict, Optional, Union
+
+NETWORK = 'network'
+THROTTLED = 'throttled'
+UNAVAILABLE = 'unavailable'
+POSTPROCESS = 'postprocess'
+DISK_SPACE = 'disk_space'
+UNKNOWN = 'unknown'
+
+FAILURE_CLASSES = [NETWORK, THROTTLED, UNAVAILABLE, POSTPROCESS, DISK_SPACE, UNKNOWN]
+RETRYABLE = {NETWORK, THROTTLED}
+
+# Fallback when there is no exception to go by: checked in this order against the error text,
+# the first class with a matching pattern wins
+ERROR_PATTERNS = [
+    (DISK_SPACE, ['no space left on device', 'not enough space on the disk', 'disk quota exceeded']),
+    (THROTTLED, ['http error 429', 'http error 403', 'too many requests', 'rate limit', 'rate-limit',
+                 "confirm you're not a bot", 'confirm you’re not a bot']),
+    # yt-dlp prefixes every postprocessor failure with "Postprocessing:"
+    (POSTPROCESS, ['postprocessing:', 'conversion failed']),
+    (UNAVAILABLE, ['video unavailable', 'private video', 'is not available', 'has been removed', 'members-only',
+                   'confirm your age', 'copyright', 'http error 404', 'http error 410', 'unsupported url',
+                   'requested format is not available', 'this live event']),
+    # "ffmpeg exited with code" comes from the ffmpeg downloader (HLS/DASH), so it is a transfer failure
+    (NETWORK, ['timed out', 'timeout', 'connection reset', 'connection refused', 'connection aborted',
+               'connection closed', 'remote end closed', 'temporary failure in name resolution',
+               'name or service not known', 'network is unreachable', 'incompleteread', 'incomplete read',
+               'http error 5', 'unexpected_eof_while_reading', 'eof occurred in violation of protocol',
+               'did not get any data blocks', 'unable to download', 'ffmpeg exited with code']),
+]
+HTTP_STATUSES = {429: THROTTLED, 403: THROTTLED, 404: UNAVAILABLE, 410: UNAVAILABLE}
+DISK_FULL_ERRNOS = {errno.ENOSPC, getattr(errno, 'EDQUOT', errno.ENOSPC)}
+
+
+class ReportedError(str):
+    # An error message yt-dlp printed, plus the exception it was handling when it did
+    cause: Optional[BaseException] = None
+
+
+class DownloadFailure(Exception):
+
+    def __init__(self, message: str, category: Optional[str] = None):
+        super().__init__(message)
+        self.category = category or classify_error(message)
+
+
+def _classify_exception(error: Optional[BaseException]) -> Optional[str]:
+    if error is None:
+        return None
+    if isinstance(error, DownloadFailure):
+        return error.category
+    if isinstance(error, OSError) and error.errno in DISK_FULL_ERRNOS:
+        return DISK_SPACE
+    if isinstance(error, (socket.timeout, TimeoutError, ConnectionError)):
+        return NETWORK
+    if 'yt_dlp' not in sys.modules:
+        # yt-dlp was never loaded, so none of its exceptions can be in play
+        return None
+
+    from yt_dlp.networking.exceptions import HTTPError, network_exceptions
+    from yt_dlp.utils import (ContentTooShortError, DownloadError, ExtractorError, GeoRestrictedError,
+                              PostProcessingError, UnsupportedError)
+
+    if isinstance(error, HTTPError):
+        return HTTP_STATUSES.get(error.status) or (NETWORK if error.status >= 500 else None)
+    if isinstance(error, PostProcessingError):
+        return POSTPROCESS
+    if isinstance(error, (ContentTooShortError, *network_exceptions)):
+        return NETWORK
+    if isinstance(error, (GeoRestrictedError, UnsupportedError)):
+        return UNAVAILABLE
+    # Both wrap the exception that actually went wrong, e.g. a TransportError while fetching the page
+    if isinstance(error, ExtractorError):
+        inner = error.cause or error.exc_info[1]
+    elif isinstance(error, DownloadError) and error.exc_info:
+        inner = error.exc_info[1]
+    else:
+        return None
+    return _classify_exception(inner) if inner is not error else None
+
+
+def classify_error(error: Union[BaseException, str]) -> str:
+    if isinstance(error, DownloadFailure):
+        return error.category
+    category = _classify_exception(error.cause if isinstance(error, ReportedError) else
+                                   error if isinstance(error, BaseException) else None)
+    if category:
+        return category
+
+    text = str(error).lower()
+    for category, patterns in ERROR_PATTERNS:
+        if any(pattern in text for pattern in patterns):
+            return category
+    return UNKNOWN
+
+
+class RetryPolicy:
+
+    def __init__(self, retries: int = 3, base_delay: float = 2.0, max_delay: float = 60.0):
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, category: str, attempt: int) -> bool:
+        return category in RETRYABLE and attempt < self.retries
+
+    def delay(self, attempt: int, category: str = NETWORK) -> float:
+        # Full jitter keeps parallel jobs that failed together from retrying in lockstep
+        base = self.base_delay * (4 if category == THROTTLED else 1)
+        return random.uniform(0, min(self.max_delay, base * 2 ** attempt))
+
+
+class FailureCounter:
+
+    def __init__(self):
+        self._counts = {category: 0 for category in FAILURE_CLASSES}
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record(self, category: str):
+        with self._lock:
+            self._counts[category] = self._counts.get(category, 0) + 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {category: count for category, count in self._counts.items() if count}
@@ -0,0 +1,60 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+
+class BatchScheduler:
+
+    def __init__(self, jobs: int = 1):
+        self.jobs = max(1, jobs)
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Any], worker: Callable[[Any], bool]) -> Dict[str, int]:
+        stats = {'successful': 0, 'failed': 0, 'total': 0}
+
+        for _, success in self.stream(items, worker):
+            stats['total'] += 1
+            self._record(stats, bool(success))
+
+        return stats
+
+    def stream(self, items: Iterable[Any], worker: Callable[[Any], Any]) -> Iterator[Tuple[Any, Any]]:
+        if self.jobs == 1:
+            for item in items:
+                yield item, self._call(worker, item)
+            return
+
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='ydl-worker')
+        try:
+            for item in items:
+                pending[pool.submit(self._call, worker, item)] = item
+                # Keep the backlog bounded so lazily produced item streams are not drained up front
+                if len(pending) >= self.jobs * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        except (KeyboardInterrupt, GeneratorExit):
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+    def _call(self, worker: Callable[[Any], Any], item: Any) -> Any:
+        try:
+            return worker(item)
+        except Exception as e:
+            print(f"❌ Job failed: {e}", file=sys.stderr)
+            return None
+
+    def _record(self, stats: Dict[str, int], success: bool):
+        with self._lock:
+            if success:
+                stats['successful'] += 1
+            else:
+                stats['failed'] += 1
@@ -0,0 +1,153 @@
+import functools
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .accelerator import RangeDownloader, accepts_ranges, is_fragmented, range_fd_class
+from .ratelimit import THROTTLE_STATUSES, RateLimiter, ThrottledResponse, parse_retry_after
+from .retry import ReportedError
+from .tracking import OutputTracker
+
+
+@functools.lru_cache(maxsize=None)
+def managed_ydl_class():
+    import yt_dlp
+    from yt_dlp.networking.exceptions import HTTPError
+
+    class ManagedYoutubeDL(yt_dlp.YoutubeDL):
+        range_downloader: Optional[RangeDownloader] = None
+        rate_limiter: Optional[RateLimiter] = None
+
+        def __init__(self, *args, **kwargs):
+            self.errors: List[str] = []
+            super().__init__(*args, **kwargs)
+
+        def trouble(self, message=None, tb=None, is_error=True):
+            # ignoreerrors only prints errors; keep them so the caller can classify and retry
+            if is_error and message:
+                # yt-dlp reports from inside its except blocks, so the exception tells what failed
+                error = ReportedError(message)
+                error.cause = sys.exc_info()[1]
+                self.errors.append(error)
+            return super().trouble(message, tb, is_error)
+
+        def take_errors(self) -> List[str]:
+            errors, self.errors = self.errors, []
+            return errors
+
+        def urlopen(self, req):
+            # Extraction, playlist pages, fragments and byte ranges all come through here
+            limiter = self.rate_limiter
+            if not limiter:
+                return super().urlopen(req)
+
+            url = req if isinstance(req, str) else req.url
+            limiter.before_request(url)
+            try:
+                response = super().urlopen(req)
+            except HTTPError as e:
+                if e.status in THROTTLE_STATUSES:
+                    limiter.throttled(url, e.status, parse_retry_after(e.response.headers.get('Retry-After')))
+                raise
+            limiter.succeeded(url)
+            return ThrottledResponse(response, limiter, url) if limiter.limits_bandwidth else response
+
+        def dl(self, name, info, subtitle=False, test=False):
+            if self.range_downloader and not subtitle and is_fragmented(info):
+                # Manifests are split already; yt-dlp fetches their fragments concurrent_fragment_downloads at a time
+                self.to_screen(f"[download] Fetching fragments over "
+                               f"{self.params.get('concurrent_fragment_downloads', 1)} connections")
+            if not self.range_downloader or subtitle or test or name == '-' or not accepts_ranges(info):
+                return super().dl(name, info, subtitle, test)
+
+            fd = range_fd_class()(self, self.params)
+            for ph in self.params.get('progress_hooks', []):
+                fd.add_progress_hook(ph)
+            return fd.download(name, dict(info), subtitle)
+
+    return ManagedYoutubeDL
+
+
+class YDLSession:
+
+    def __init__(self, profile: str):
+        self.profile = profile
+        self.ydl = None
+        self.tracker: Optional[OutputTracker] = None
+        self.uses = 0
+
+    def progress_hook(self, d: Dict):
+        if self.tracker:
+            self.tracker.progress_hook(d)
+
+    def postprocessor_hook(self, d: Dict):
+        if self.tracker:
+            self.tracker.postprocessor_hook(d)
+
+
+class SessionPool:
+
+    def __init__(self, accelerator: Optional[RangeDownloader] = None, rate_limiter: Optional[RateLimiter] = None):
+        self.accelerator = accelerator
+        self.rate_limiter = rate_limiter
+        self._idle: Dict[str, List[YDLSession]] = {}
+        self._all: List[YDLSession] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def session(self, profile: str, opts_factory: Callable[[], Dict],
+                tracker: Optional[OutputTracker] = None) -> Iterator[YDLSession]:
+        session = self._checkout(profile, opts_factory)
+        session.tracker = tracker
+        try:
+            yield session
+        finally:
+            session.tracker = None
+            session.uses += 1
+            self._checkin(session)
+
+    def _checkout(self, profile: str, opts_factory: Callable[[], Dict]) -> YDLSession:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Session pool is closed")
+            idle = self._idle.get(profile)
+            if idle:
+                return idle.pop()
+
+        session = YDLSession(profile)
+        opts = dict(opts_factory())
+        # Hooks go through the session so a warm instance can report to whichever download is using it
+        opts['progress_hooks'] = [session.progress_hook]
+        opts['postprocessor_hooks'] = [session.postprocessor_hook]
+        session.ydl = managed_ydl_class()(opts)
+        session.ydl.range_downloader = self.accelerator
+        session.ydl.rate_limiter = self.rate_limiter
+        with self._lock:
+            self._all.append(session)
+        return session
+
+    def _checkin(self, session: YDLSession):
+        with self._lock:
+            if self._closed:
+                session.ydl.close()
+                return
+            self._idle.setdefault(session.profile, []).append(session)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'instances': len(self._all),
+                'uses': sum(session.uses for session in self._all),
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            sessions, self._all, self._idle = self._all, [], {}
+        for session in sessions:
+            try:
+                session.ydl.close()
+            except Exception:
+                pass
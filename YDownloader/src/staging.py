@@ -0,0 +1,138 @@
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .retry import DISK_SPACE, DownloadFailure
+from .utils import format_file_size
+
+SCRATCH_DIRNAME = '.ydownloader_scratch'
+DEFAULT_MIN_FREE = 512 * 1024 * 1024
+# Partial downloads younger than this are kept so a rerun can resume them
+ORPHAN_AGE = 24 * 3600
+# Peak scratch use per job: the downloaded streams plus the merged/converted file written next to them
+SCRATCH_FACTOR = 2
+
+
+def estimate_download_size(info: Dict, formats: Iterable[Dict]) -> int:
+    total = 0
+    for fmt in list(formats) or [info]:
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and info.get('duration'):
+            # No size advertised: the average bitrate over the whole duration is close enough to plan with
+            size = fmt['tbr'] * 1000 / 8 * info['duration']
+        total += int(size or 0)
+    return total
+
+
+class Reservation:
+
+    def __init__(self, space: 'ScratchSpace', needs: Dict[int, int]):
+        self.space = space
+        self.needs = needs
+        self.released = False
+
+    def release(self):
+        self.space._release(self)
+
+
+class ScratchSpace:
+
+    def __init__(self, output_dir: Path, scratch_dir: Optional[Path] = None, min_free: int = DEFAULT_MIN_FREE):
+        self.output_dir = Path(output_dir)
+        self.scratch_dir = Path(scratch_dir) if scratch_dir else self.output_dir / SCRATCH_DIRNAME
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        self.min_free = min_free
+        self._reserved: Dict[int, int] = {}
+        self._condition = threading.Condition()
+
+    def _device(self, path: Path) -> int:
+        return os.stat(path).st_dev
+
+    def cleanup_orphans(self, max_age: float = ORPHAN_AGE) -> int:
+        # Leftovers of crashed or killed runs; anything touched recently may belong to a live download
+        removed, freed = 0, 0
+        cutoff = time.time() - max_age
+        for path in self.scratch_dir.iterdir():
+            try:
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+                removed += 1
+                freed += stat.st_size
+            except OSError:
+                continue
+        if removed:
+            # Runs on every start, --info included, so keep it out of stdout
+            print(f"🧹 Removed {removed} orphaned scratch files ({format_file_size(freed)})", file=sys.stderr)
+        return removed
+
+    def reserve(self, nbytes: int) -> Reservation:
+        if not nbytes:
+            return Reservation(self, {})
+
+        # Same volume: the final rename is free. Otherwise the output volume also has to hold the result.
+        needs: Dict[int, int] = {}
+        scratch_device, output_device = self._device(self.scratch_dir), self._device(self.output_dir)
+        needs[scratch_device] = nbytes * SCRATCH_FACTOR
+        if output_device != scratch_device:
+            needs[output_device] = nbytes
+        paths = {output_device: self.output_dir, scratch_device: self.scratch_dir}
+
+        announced = False
+        with self._condition:
+            while True:
+                short = {device: need - (shutil.disk_usage(paths[device]).free - self.min_free
+                                         - self._reserved.get(device, 0))
+                         for device, need in needs.items()}
+                if all(missing <= 0 for missing in short.values()):
+                    for device, need in needs.items():
+                        self._reserved[device] = self._reserved.get(device, 0) + need
+                    return Reservation(self, needs)
+
+                if not any(self._reserved.values()):
+                    # Nothing in flight will free space for us, so waiting would never end
+                    device = max(short, key=short.get)
+                    raise DownloadFailure(f"Not enough disk space in {paths[device]}: need "
+                                          f"{format_file_size(needs[device])} plus "
+                                          f"{format_file_size(self.min_free)} headroom, "
+                                          f"{format_file_size(shutil.disk_usage(paths[device]).free)} free",
+                                          DISK_SPACE)
+                if not announced:
+                    announced = True
+                    print(f"💽 Waiting for disk space ({format_file_size(nbytes)} estimated)...")
+                self._condition.wait(timeout=30)
+
+    def _release(self, reservation: Reservation):
+        with self._condition:
+            if reservation.released:
+                return
+            reservation.released = True
+            for device, need in reservation.needs.items():
+                self._reserved[device] = max(0, self._reserved.get(device, 0) - need)
+            self._condition.notify_all()
+
+    def publish(self, path: str) -> str:
+        source = Path(path)
+        target = self.output_dir / source.name
+        if source.parent.resolve() == self.output_dir.resolve():
+            return str(source)
+        try:
+            os.replace(source, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Scratch is on another volume: copy beside the target, then rename so readers never see a partial file
+            staging = target.with_name(f".{target.name}.publishing")
+            shutil.copyfile(source, staging)
+            os.replace(staging, target)
+            os.remove(source)
+        return str(target)
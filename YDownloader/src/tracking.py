@@ -0,0 +1,75 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+VIDEO_EXTENSIONS = ['.mp4', '.mkv', '.webm', '.avi', '.mov']
+
+
+class OutputTracker:
+
+    def __init__(self, cancelled: Optional[threading.Event] = None):
+        self.cancelled = cancelled
+        self.video_files: List[str] = []
+        self.audio_files: List[str] = []
+        self.final_files: List[str] = []
+        self.output_file: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def progress_hook(self, d: Dict):
+        if self.cancelled and self.cancelled.is_set():
+            from yt_dlp.utils import DownloadCancelled
+
+            # Raising from a progress hook is how yt-dlp lets a caller abort a transfer
+            raise DownloadCancelled()
+        if d.get('status') != 'finished' or not d.get('filename'):
+            return
+
+        info = d.get('info_dict') or {}
+        has_video = info.get('vcodec') not in (None, 'none')
+        has_audio = info.get('acodec') not in (None, 'none')
+        with self._lock:
+            if has_video and not has_audio:
+                self.video_files.append(d['filename'])
+            elif has_audio and not has_video:
+                self.audio_files.append(d['filename'])
+            else:
+                self.final_files.append(d['filename'])
+
+    def postprocessor_hook(self, d: Dict):
+        if d.get('status') != 'finished':
+            return
+
+        filepath = (d.get('info_dict') or {}).get('filepath')
+        if not filepath:
+            return
+        with self._lock:
+            # The merger and MoveFiles report the file that replaced the downloaded streams
+            if filepath not in self.final_files:
+                self.final_files.append(filepath)
+
+    def unmerged_pair(self) -> Optional[List[str]]:
+        videos = [f for f in self.video_files if os.path.exists(f)]
+        audios = [f for f in self.audio_files if os.path.exists(f)]
+        if len(videos) == 1 and len(audios) == 1:
+            return [videos[0], audios[0]]
+        return None
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            files = set(self.video_files + self.audio_files + self.final_files)
+        return sum(os.path.getsize(f) for f in files if os.path.exists(f))
+
+    def final_file(self) -> Optional[str]:
+        for filepath in reversed(self.final_files):
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+
+def output_base(file_path: str) -> Path:
+    path = Path(file_path)
+    # Strip the ".f<format_id>" marker yt-dlp adds to separately downloaded streams
+    return path.with_name(re.sub(r'\.f[\w-]+$', '', path.stem))
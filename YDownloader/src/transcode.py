@@ -0,0 +1,167 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .media import TRANSCODE_PROFILES, codec_args
+from .progress import ProgressCallback, run_ffmpeg
+
+
+OUTPUT_ARGS = [
+    '-movflags', '+faststart',
+    '-f', 'mp4',
+    '-strict', 'experimental',
+    '-avoid_negative_ts', 'make_zero',
+    '-y',
+]
+
+
+class TranscodeEngine:
+
+    SEGMENT_SECONDS = 120
+    MIN_SEGMENTED_DURATION = 600
+    SEGMENT_TIMEOUT = 1800
+
+    def __init__(self, ffmpeg_cmd: str, workers: Optional[int] = None,
+                 segment_seconds: int = SEGMENT_SECONDS, min_segmented_duration: int = MIN_SEGMENTED_DURATION,
+                 on_progress: Optional[ProgressCallback] = None):
+        self.ffmpeg_cmd = ffmpeg_cmd
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.segment_seconds = segment_seconds
+        self.min_segmented_duration = min_segmented_duration
+        self.on_progress = on_progress
+
+    def run(self, video_input: str, output_file: str, plan: Dict[str, Optional[str]], profile: str = 'compatible',
+            audio_input: Optional[str] = None, duration: Optional[float] = None) -> Tuple[bool, str]:
+        if profile not in TRANSCODE_PROFILES:
+            return False, f"Unknown transcode profile: {profile}"
+
+        task = Path(output_file).name
+        self._emit(task, status='start', duration=duration)
+        success = False
+        try:
+            if (plan.get('video') == 'transcode' and self.workers > 1
+                    and duration and duration >= self.min_segmented_duration):
+                success, error = self._run_segmented(video_input, output_file, plan, profile, audio_input, duration, task)
+            else:
+                cmd = [self.ffmpeg_cmd, *self._input_args(video_input, audio_input), *codec_args(plan, profile), *OUTPUT_ARGS, output_file]
+                success, error = self._run(cmd, self._timeout(duration), duration, self._reporter(task, 'encode'))
+            return success, error
+        finally:
+            self._emit(task, status='end', success=success)
+
+    def _emit(self, task: str, **event):
+        if self.on_progress:
+            self.on_progress({'task': task, **event})
+
+    def _reporter(self, task: str, stage: str):
+        if not self.on_progress:
+            return None
+        return lambda snapshot: self._emit(task, status='progress', stage=stage, **snapshot)
+
+    def _input_args(self, video_input: str, audio_input: Optional[str]) -> List[str]:
+        if audio_input and audio_input != video_input:
+            return ['-i', video_input, '-i', audio_input, '-map', '0:v:0', '-map', '1:a:0']
+        return ['-i', video_input, '-map', '0:v:0?', '-map', '0:a:0?']
+
+    def _timeout(self, duration: Optional[float]) -> Optional[float]:
+        # A single libx264 pass over a long 4K file can easily run slower than real time
+        if not duration:
+            return None
+        return max(self.SEGMENT_TIMEOUT, duration * 10)
+
+    def _run(self, cmd: List[str], timeout: Optional[float], duration: Optional[float] = None,
+             on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str]:
+        return run_ffmpeg(cmd, duration, on_progress, timeout)
+
+    def _segment_reporter(self, task: str, duration: float):
+        if not self.on_progress:
+            return lambda segment: None
+
+        lock = threading.Lock()
+        positions = {}
+        rates = {}
+
+        def for_segment(segment: Path):
+            def report(snapshot: Dict):
+                with lock:
+                    positions[segment] = snapshot.get('out_time') or 0.0
+                    rates[segment] = (0.0, 0.0) if snapshot.get('done') else (snapshot.get('fps') or 0.0, snapshot.get('speed') or 0.0)
+                    encoded = sum(positions.values())
+                    fps = sum(rate[0] for rate in rates.values())
+                    speed = sum(rate[1] for rate in rates.values())
+                percent = min(100.0, encoded / duration * 100)
+                eta = max(0.0, (duration - encoded) / speed) if speed else None
+                self._emit(task, status='progress', stage='encode', out_time=encoded, percent=percent,
+                           fps=fps or None, speed=speed or None, eta=eta)
+            return report
+
+        return for_segment
+
+    def _run_segmented(self, video_input: str, output_file: str, plan: Dict[str, Optional[str]], profile: str,
+                       audio_input: Optional[str], duration: float, task: str) -> Tuple[bool, str]:
+        work_dir = Path(tempfile.mkdtemp(prefix='.ydl-segments-', dir=str(Path(output_file).parent)))
+        try:
+            # Stream copy only cuts on keyframes, so every segment starts decodable
+            split_cmd = [
+                self.ffmpeg_cmd, '-v', 'error',
+                '-i', video_input,
+                '-map', '0:v:0',
+                '-c', 'copy',
+                '-f', 'segment',
+                '-segment_time', str(self.segment_seconds),
+                '-reset_timestamps', '1',
+                str(work_dir / 'src_%05d.mkv')
+            ]
+            ok, error = self._run(split_cmd, self.SEGMENT_TIMEOUT)
+            segments = sorted(work_dir.glob('src_*.mkv'))
+            if not ok or not segments:
+                return False, error or "Could not split input into segments"
+
+            workers = min(self.workers, len(segments))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            print(f"🧩 Encoding {len(segments)} segments of ~{self.segment_seconds}s on {workers} workers...")
+
+            reporter = self._segment_reporter(task, duration)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ydl-encode') as pool:
+                results = list(pool.map(lambda segment: self._encode_segment(segment, profile, threads, reporter(segment)), segments))
+            for ok, error in results:
+                if not ok:
+                    return False, error
+
+            list_file = work_dir / 'segments.txt'
+            list_file.write_text(''.join(f"file '{segment.with_suffix('.mp4').name}'\n" for segment in segments), encoding='utf-8')
+
+            audio_plan = {'video': None, 'audio': plan.get('audio')}
+            concat_cmd = [
+                self.ffmpeg_cmd,
+                '-f', 'concat', '-safe', '0', '-i', str(list_file),
+                '-i', audio_input or video_input,
+                '-map', '0:v:0',
+                '-map', '1:a:0?',
+                '-c:v', 'copy',
+                *codec_args(audio_plan, profile),
+                *OUTPUT_ARGS,
+                output_file
+            ]
+            return self._run(concat_cmd, self._timeout(duration), duration, self._reporter(task, 'concat'))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _encode_segment(self, segment: Path, profile: str, threads: int,
+                        on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str]:
+        cmd = [
+            self.ffmpeg_cmd, '-v', 'error',
+            '-i', str(segment),
+            '-map', '0:v:0',
+            *TRANSCODE_PROFILES[profile]['video'],
+            '-threads', str(threads),
+            '-an',
+            '-f', 'mp4',
+            '-y',
+            str(segment.with_suffix('.mp4'))
+        ]
+        return self._run(cmd, self.SEGMENT_TIMEOUT, on_progress=on_progress)
@@ -1,5 +1,5 @@
 import re
-from typing import Dict
+from typing import Dict, List, Optional
 from colorama import Fore, Style
 
 
@@ -18,7 +18,36 @@ def validate_url(url: str) -> bool:
     return False
 
 
-def print_banner():
+def read_url_list(file_path: str) -> List[str]:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def is_collection_url(url: str) -> bool:
+    collection_patterns = [
+        r'(?:https?://)?(?:www\.|m\.)?youtube\.com/playlist\?list=[\w-]+',
+        r'(?:https?://)?(?:www\.|m\.)?youtube\.com/(?:channel|c|user)/[\w-]+',
+        r'(?:https?://)?(?:www\.|m\.)?youtube\.com/@[\w.-]+',
+    ]
+    
+    return any(re.match(pattern, url) for pattern in collection_patterns)
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    video_patterns = [
+        r'(?:https?://)?(?:www\.|m\.)?youtube\.com/watch\?(?:.*&)?v=([\w-]{11})',
+        r'(?:https?://)?(?:www\.)?youtu\.be/([\w-]{11})',
+        r'(?:https?://)?(?:www\.|m\.)?youtube\.com/(?:shorts|embed|live)/([\w-]{11})',
+    ]
+    
+    for pattern in video_patterns:
+        match = re.match(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def print_banner(file=None):
     banner = f"""
 {Fore.CYAN}╔══════════════════════════════════════════════╗
 ║                 YDownloader                  ║
@@ -26,18 +55,40 @@ def print_banner():
 ║                  Version 1.0.0              ║
 ╚══════════════════════════════════════════════╝{Style.RESET_ALL}
 """
-    print(banner)
+    print(banner, file=file)
 
 
-def print_stats(stats: Dict[str, int]):
-    print(f"\n{Fore.CYAN}═══ Download Statistics ═══")
-    print(f"{Fore.GREEN}✓ Successful: {stats['successful']}")
-    print(f"{Fore.RED}✗ Failed: {stats['failed']}")
-    print(f"{Fore.CYAN}Total: {stats['total']}")
+def print_stats(stats: Dict, file=None):
+    print(f"\n{Fore.CYAN}═══ Download Statistics ═══", file=file)
+    print(f"{Fore.GREEN}✓ Successful: {stats['successful']}", file=file)
+    print(f"{Fore.RED}✗ Failed: {stats['failed']}", file=file)
+    print(f"{Fore.CYAN}Total: {stats['total']}", file=file)
     
     if stats['total'] > 0:
         success_rate = (stats['successful'] / stats['total']) * 100
-        print(f"{Fore.YELLOW}Success rate: {success_rate:.1f}%")
+        print(f"{Fore.YELLOW}Success rate: {success_rate:.1f}%", file=file)
+    
+    timings = stats.get('timings')
+    if timings:
+        print(f"{Fore.CYAN}Time downloading: {format_duration(round(timings['fetch']))}, "
+              f"post-processing: {format_duration(round(timings['postprocess']))}, "
+              f"wall clock: {format_duration(round(timings['wall']))}", file=file)
+        streams = timings.get('streams')
+        if streams:
+            print(f"{Fore.CYAN}Stream transfer: video {format_duration(round(streams['video']))}, "
+                  f"audio {format_duration(round(streams['audio']))}", file=file)
+    
+    failures = stats.get('failures')
+    if failures:
+        summary = ', '.join(f"{category}: {count}" for category, count in failures.items())
+        print(f"{Fore.RED}Failures by type: {summary}", file=file)
+    if stats.get('retries'):
+        print(f"{Fore.YELLOW}Retries: {stats['retries']}", file=file)
+    
+    rate_limit = stats.get('rate_limit')
+    if rate_limit and (rate_limit['throttle_events'] or rate_limit['waited']):
+        print(f"{Fore.YELLOW}Rate limiting: {rate_limit['throttle_events']} throttled responses, "
+              f"{format_duration(round(rate_limit['waited']))} spent waiting", file=file)
 
 
 def format_duration(seconds: int) -> str:
@@ -66,6 +117,15 @@ def format_file_size(bytes_size: int) -> str:
     return f"{size:.1f} {units[unit_index]}"
 
 
+def parse_size(value: str) -> int:
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    
+    multipliers = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    return int(float(match.group(1)) * multipliers[match.group(2).upper()])
+
+
 def create_safe_filename(filename: str) -> str:
     invalid_chars = r'<>:"/\\|?*'
     safe_filename = filename
@@ -0,0 +1,295 @@
+import http.server
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.accelerator import RangeDownloader, accepts_ranges, is_fragmented
+
+CHUNK_SIZE = 128 * 1024
+SEGMENTS = 8
+
+MANIFEST = '''<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT{segments}S"
+     minBufferTime="PT2S" profiles="urn:mpeg:dash:profile:isoff-main:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4" contentType="video">
+      <Representation id="v1" codecs="avc1.64001f" bandwidth="500000" width="320" height="240">
+        <SegmentList duration="1" timescale="1">
+          <Initialization sourceURL="init.bin"/>
+{urls}
+        </SegmentList>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+'''
+
+
+class MediaServer:
+
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+        self.reset()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Range start -> number of responses to cut off halfway through
+        self.truncate = {}
+        # Range starts that always answer 503
+        self.broken = set()
+        self.fail_probe = 0
+        self.delay = 0.0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve(self, handler: http.server.BaseHTTPRequestHandler):
+        name = handler.path.lstrip('/')
+        data = self.files.get(name)
+        if data is None:
+            handler.send_error(404)
+            return
+        header = handler.headers.get('Range')
+        with self.lock:
+            self.requests.append((name, header))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self._respond(handler, data, header)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _respond(self, handler: http.server.BaseHTTPRequestHandler, data: bytes, header: str):
+        match = re.match(r'bytes=(\d+)-(\d*)', header or '')
+        if not match:
+            time.sleep(self.delay)
+            self._send(handler, 200, data)
+            return
+
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+        with self.lock:
+            if header == 'bytes=0-0' and self.fail_probe:
+                self.fail_probe -= 1
+                start = None
+            truncated = self.truncate.get(start, 0) > 0
+            if truncated:
+                self.truncate[start] -= 1
+        if start is None or start in self.broken:
+            self._send(handler, 503, b'')
+            return
+        if start >= len(data):
+            self._send(handler, 416, b'', {'Content-Range': f'bytes */{len(data)}'})
+            return
+
+        time.sleep(self.delay)
+        body = data[start:end + 1]
+        headers = {'Content-Range': f'bytes {start}-{end}/{len(data)}'}
+        if truncated:
+            # Promise the whole range but hang up halfway, like a dropped connection
+            self._send(handler, 206, body[:len(body) // 2], headers, length=len(body))
+            handler.close_connection = True
+            return
+        self._send(handler, 206, body, headers)
+
+    @staticmethod
+    def _send(handler, status: int, body: bytes, headers: dict = None, length: int = None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Accept-Ranges', 'bytes')
+        handler.send_header('Content-Length', str(len(body) if length is None else length))
+        handler.end_headers()
+        handler.wfile.write(body)
+        handler.wfile.flush()
+
+
+class RangeDownloadTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MediaServer()
+        cls.data = os.urandom(1024 * 1024 + 12345)
+        cls.server.files['media.bin'] = cls.data
+        cls.url = f'{cls.server.base_url}/media.bin'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        self.server.reset()
+        self.work_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.work_dir, 'media.bin.part')
+        self.accelerator = RangeDownloader(connections=4, chunk_size=CHUNK_SIZE)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def read_output(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def range_requests(self):
+        return [header for name, header in self.server.requests if name == 'media.bin' and header != 'bytes=0-0']
+
+    def test_probe_reports_size(self):
+        self.assertEqual(self.accelerator.probe(self.url), len(self.data))
+
+    def test_ranges_cover_file(self):
+        ranges = self.accelerator.ranges(len(self.data))
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(self.data) - 1)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(start, end + 1)
+        self.assertTrue(all(end - start + 1 <= CHUNK_SIZE for start, end in ranges))
+
+    def test_download_splits_into_parallel_ranges(self):
+        self.server.delay = 0.05
+        size = self.accelerator.download(self.url, self.path, len(self.data))
+
+        self.assertEqual(size, len(self.data))
+        self.assertEqual(self.read_output(), self.data)
+        expected = [f'bytes={start}-{end}' for start, end in self.accelerator.ranges(len(self.data))]
+        self.assertEqual(sorted(self.range_requests()), sorted(expected))
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertFalse(os.path.exists(self.path + '.ranges'))
+
+    def test_dropped_range_resumes_from_last_byte(self):
+        start, end = self.accelerator.ranges(len(self.data))[2]
+        self.server.truncate[start] = 1
+        self.accelerator.download(self.url, self.path, len(self.data))
+
+        self.assertEqual(self.read_output(), self.data)
+        retries = [header for header in self.range_requests()
+                   if header.endswith(f'-{end}') and header != f'bytes={start}-{end}']
+        self.assertEqual(len(retries), 1)
+        resumed_at = int(re.match(r'bytes=(\d+)-', retries[0]).group(1))
+        self.assertGreater(resumed_at, start)
+
+    def test_journal_resumes_only_missing_ranges(self):
+        ranges = self.accelerator.ranges(len(self.data))
+        broken_start, broken_end = ranges[-1]
+        self.server.broken.add(broken_start)
+        with self.assertRaises(IOError):
+            self.accelerator.download(self.url, self.path, len(self.data))
+        with open(self.path + '.ranges', encoding='utf-8') as f:
+            journal = f.read().split('\n')
+        self.assertEqual(journal[0], str(len(self.data)))
+        finished = {line for line in journal[1:] if line}
+        self.assertNotIn(f'{broken_start} {broken_end}', finished)
+
+        self.server.reset()
+        self.accelerator.download(self.url, self.path, len(self.data))
+        self.assertEqual(self.read_output(), self.data)
+        refetched = {tuple(map(int, re.match(r'bytes=(\d+)-(\d+)', header).groups()))
+                     for header in self.range_requests()}
+        self.assertIn((broken_start, broken_end), refetched)
+        self.assertFalse(refetched & {tuple(map(int, line.split())) for line in finished})
+        self.assertFalse(os.path.exists(self.path + '.ranges'))
+
+    def test_failed_probe_discards_preallocated_part(self):
+        from src.session import managed_ydl_class
+
+        # What an interrupted ranged attempt leaves behind: a full-size .part of zeros and its journal
+        output = os.path.join(self.work_dir, 'media.bin')
+        with open(output + '.part', 'wb') as f:
+            f.truncate(len(self.data))
+        with open(output + '.part.ranges', 'w', encoding='utf-8') as f:
+            f.write(f'{len(self.data)}\n')
+
+        self.server.fail_probe = 1
+        ydl = managed_ydl_class()({'quiet': True, 'noprogress': True, 'continuedl': True, 'retries': 0})
+        ydl.range_downloader = self.accelerator
+        try:
+            ydl.dl(output, {'id': 'media', 'format_id': 'f1', 'ext': 'bin', 'url': self.url, 'protocol': 'http',
+                            'http_headers': {}})
+        finally:
+            ydl.close()
+
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(os.path.exists(output + '.part.ranges'))
+
+
+class DashManifestTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MediaServer()
+        cls.init = os.urandom(2048)
+        cls.segments = [os.urandom(32 * 1024) for _ in range(SEGMENTS)]
+        cls.server.files['init.bin'] = cls.init
+        for index, segment in enumerate(cls.segments, 1):
+            cls.server.files[f'seg-{index}.bin'] = segment
+        urls = '\n'.join(f'          <SegmentURL media="seg-{index}.bin"/>' for index in range(1, SEGMENTS + 1))
+        cls.server.files['manifest.mpd'] = MANIFEST.format(segments=SEGMENTS, urls=urls).encode('utf-8')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        from src.downloader import YouTubeDownloader
+
+        self.server.reset()
+        self.work_dir = tempfile.mkdtemp()
+        self.downloader = YouTubeDownloader(output_dir=self.work_dir, connections=4, chunk_size=CHUNK_SIZE,
+                                            use_cache=False, use_archive=False)
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_fragments_download_in_parallel(self):
+        self.server.delay = 0.05
+        with self.downloader.sessions.session('download', self.downloader.get_ydl_opts) as session:
+            ydl = session.ydl
+            info = ydl.extract_info(f'{self.server.base_url}/manifest.mpd', download=False, process=False)
+            formats = info['formats']
+            self.assertEqual(len(formats), 1)
+            fmt = formats[0]
+            self.assertTrue(is_fragmented(fmt))
+            self.assertFalse(accepts_ranges(fmt))
+
+            output = os.path.join(self.work_dir, 'manifest.mp4')
+            base_info = {key: value for key, value in info.items() if key != 'formats'}
+            self.assertTrue(ydl.dl(output, {**base_info, **fmt, 'http_headers': fmt.get('http_headers') or {}}))
+
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), self.init + b''.join(self.segments))
+        fetched = [name for name, _ in self.server.requests if name.startswith('seg-')]
+        self.assertEqual(sorted(fetched), sorted(f'seg-{index}.bin' for index in range(1, SEGMENTS + 1)))
+        self.assertGreater(self.server.max_in_flight, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
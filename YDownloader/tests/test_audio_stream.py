@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio_stream import StreamCancelled, iter_ranges, stream_audio, until_cancelled
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FakeResponse:
+
+    def __init__(self, data: bytes, start: int, end: int, total: int):
+        self.status = 206
+        self.headers = {'Content-Range': f'bytes {start}-{end}/{total}'}
+        self.data = data
+
+    def read(self, size: int) -> bytes:
+        block, self.data = self.data[:size], self.data[size:]
+        return block
+
+    def close(self):
+        pass
+
+
+class RangeSource:
+    # Serves byte ranges of a file from memory and can drop the connection after a given byte
+
+    def __init__(self, data: bytes, fail_at: int = None):
+        self.data = data
+        self.fail_at = fail_at
+        self.requests = []
+
+    def __call__(self, start: int, end: int) -> FakeResponse:
+        self.requests.append((start, end))
+        if self.fail_at is not None and start >= self.fail_at:
+            raise ConnectionResetError(f"Connection reset at byte {start}")
+        stop = end + 1 if self.fail_at is None else min(end + 1, self.fail_at)
+        return FakeResponse(self.data[start:stop], start, end, len(self.data))
+
+
+@unittest.skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+class StreamAudioTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.work_dir = tempfile.mkdtemp()
+        source = os.path.join(cls.work_dir, 'source.mp3')
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=20',
+                        '-c:a', 'libmp3lame', '-b:a', '128k', '-y', source], check=True)
+        with open(source, 'rb') as f:
+            cls.data = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.work_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.output = os.path.join(self.work_dir, 'output.mp3')
+        for path in (self.output, self.output + '.part'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_complete_stream_succeeds(self):
+        source = RangeSource(self.data)
+        success, _ = stream_audio('ffmpeg', iter_ranges(source, CHUNK_SIZE), self.output, 'mp3', 'mp3', 20)
+
+        self.assertTrue(success)
+        self.assertTrue(os.path.exists(self.output))
+        self.assertGreater(len(source.requests), 1)
+
+    def test_truncated_stream_fails_without_output(self):
+        source = RangeSource(self.data, fail_at=len(self.data) // 3)
+        with self.assertRaises(ConnectionResetError):
+            stream_audio('ffmpeg', iter_ranges(source, CHUNK_SIZE), self.output, 'mp3', 'mp3', 20)
+
+        self.assertFalse(os.path.exists(self.output))
+        self.assertFalse(os.path.exists(self.output + '.part'))
+
+    def test_cancelled_stream_fails_without_output(self):
+        cancelled = threading.Event()
+
+        def chunks():
+            for index, chunk in enumerate(iter_ranges(RangeSource(self.data), CHUNK_SIZE)):
+                if index == 2:
+                    cancelled.set()
+                yield chunk
+
+        with self.assertRaises(StreamCancelled):
+            stream_audio('ffmpeg', until_cancelled(chunks(), cancelled), self.output, 'mp3', 'mp3', 20)
+
+        self.assertFalse(os.path.exists(self.output))
+        self.assertFalse(os.path.exists(self.output + '.part'))
+
+
+if __name__ == '__main__':
+    unittest.main()
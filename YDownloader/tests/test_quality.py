@@ -0,0 +1,33 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.quality import QUALITY_RULES, format_spec
+
+# The hard-coded format strings the built-in qualities used before they became rules
+BASELINE_FORMATS = {
+    'best': 'bestvideo[vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[vcodec!*=av01]+bestaudio[acodec!*=opus]/best[ext=mp4]/best',
+    'ultra': 'bestvideo[height>=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/bestvideo[height>=1440][vcodec!*=av01]+bestaudio[acodec!*=opus]/bestvideo+bestaudio/best',
+    '4k': 'bestvideo[height>=2160][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=2160]',
+    '1440p': 'bestvideo[height>=1440][height<=2160][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=1440][height<=2160][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=1440][height<=2160]',
+    '1080p': 'bestvideo[height>=1080][height<=1440][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=1080][height<=1440][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=1080][height<=1440]',
+    '720p': 'bestvideo[height>=720][height<=1080][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=720][height<=1080][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=720][height<=1080]',
+    '480p': 'bestvideo[height>=480][height<=720][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=480][height<=720][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=480][height<=720]',
+    '360p': 'bestvideo[height>=360][height<=480][vcodec!*=av01][ext=mp4]+bestaudio[acodec!*=opus]/bestvideo[height>=360][height<=480][vcodec!*=av01]+bestaudio[acodec!*=opus]/best[height>=360][height<=480]',
+    'worst': 'worst[ext=mp4]/worst',
+    'audio': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio',
+}
+
+
+class FormatSpecTest(unittest.TestCase):
+    def test_builtin_rules_match_baseline(self):
+        self.assertEqual(set(QUALITY_RULES), set(BASELINE_FORMATS))
+        for name, rule in QUALITY_RULES.items():
+            with self.subTest(quality=name):
+                self.assertEqual(format_spec(rule), BASELINE_FORMATS[name])
+
+
+if __name__ == '__main__':
+    unittest.main()